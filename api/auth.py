@@ -1,7 +1,7 @@
 from functools import wraps
 from flask import request, jsonify
-import os
 import logging
+from config import IS_DEPLOYMENT, VKB_API_KEY
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +12,10 @@ def require_api_key(f):
             return f(*args, **kwargs)
 
         # Skip API key check if we're in a deployment environment or API key isn't set
-        if os.environ.get("REPL_DEPLOYMENT"):
+        if IS_DEPLOYMENT:
             logger.warning("Deployment mode detected, skipping API key check.")
             return f(*args, **kwargs)
 
-        # Always fetch the latest API key from environment
-        VKB_API_KEY = os.environ.get("VKB_API_KEY")
         if not VKB_API_KEY:
             logger.error("Server-side API key (VKB_API_KEY) is not set.")
             return jsonify({"error": "Server configuration error: Missing API key"}), 500
@@ -61,9 +59,7 @@ def require_api_key(f):
             logger.warning("API request missing API key.")
             return jsonify({"error": "Missing API key"}), 401
 
-        # Verify API key matches environment variable
-        VKB_API_KEY = os.environ.get("VKB_API_KEY")
-        
+        # Verify API key matches the configured key
         if api_key != VKB_API_KEY:
             logger.warning("Invalid API key provided.")
             return jsonify({"error": "Invalid API key"}), 401
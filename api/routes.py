@@ -2,9 +2,8 @@ import os
 import uuid
 import logging
 import traceback
-import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, current_app, request, jsonify, make_response
 from services.pdf_processor import PDFProcessor
 from services.vector_store import VectorStore
 from models import Document
@@ -19,21 +18,24 @@ bp = Blueprint('api', __name__, url_prefix='/api')  # Add explicit URL prefix
 # Add privacy filter to logger
 privacy_filter = PrivacyLogFilter()
 logger.addFilter(privacy_filter)
+
 def json_response(payload, status=200):
     """Helper function to create consistent JSON responses.
     Uses a simplified approach to ensure reliable response handling."""
-    logger.debug(f"Creating JSON response with status {status}")
-    logger.debug(f"Response payload: {payload}")
+    logger.debug("Creating JSON response with status %s", status)
+    logger.debug("Response payload: %s", payload)
 
-    response = make_response(json.dumps(payload), status)
-    response.mimetype = 'application/json'
+    # Serialize through the app's JSON provider (orjson when installed)
+    response = current_app.json.response(payload)
+    response.status_code = status
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-API-KEY'
     response.headers.pop('Location', None)  # Prevent any redirects
     response.autocorrect_location_header = False
 
-    logger.debug(f"Response headers: {dict(response.headers)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Response headers: %s", dict(response.headers))
     return response
 
 @bp.route('upload', methods=['POST', 'OPTIONS'])  # Remove leading slash since url_prefix adds it
@@ -41,7 +43,8 @@ def json_response(payload, status=200):
 def upload_document():
     """Upload and process a PDF document"""
     logger.info(f"API: Received {request.method} request to /api/upload")
-    logger.info(f"Request headers: {dict(request.headers)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request headers: %s", dict(request.headers))
     logger.info(f"Request form data keys: {list(request.form.keys())}")
     logger.info(f"Request files keys: {list(request.files.keys())}")
 
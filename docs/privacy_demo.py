@@ -18,7 +18,7 @@ import traceback
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.privacy_log_handler import PrivacyLogFilter, add_privacy_filter_to_logger
+from utils.privacy_log_handler import PrivacyLogFilter, RedactedJSON, add_privacy_filter_to_logger
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -26,6 +26,13 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger("privacy_demo")
 add_privacy_filter_to_logger(logger)
 
+# Patterns used to sanitize exception messages, selected once at import
+# rather than re-filtering the full pattern dict for every exception
+_PW_PATTERNS = [
+    pattern for pattern_name, pattern in PrivacyLogFilter().patterns.items()
+    if 'password' in pattern_name.lower() or pattern_name == 'api_key'
+]
+
 def demonstrate_privacy_features():
     """Demonstrate how the privacy features work"""
     print("\n==== Privacy Controls Demonstration ====\n")
@@ -44,9 +51,9 @@ def demonstrate_privacy_features():
     print(f"  API Key: {api_key}")
     
     print("\nNow logging the same data (notice the redaction):")
-    logger.info(f"Processing query: {sensitive_query}")
-    logger.info(f"User contact: {email}")
-    logger.info(f"Using API key: {api_key}")
+    logger.info("Processing query: %s", sensitive_query)
+    logger.info("User contact: %s", email)
+    logger.info("Using API key: %s", api_key)
     
     # Demo 2: JSON data with sensitive information
     print("\n--- Demo 2: JSON Data with Sensitive Information ---")
@@ -64,8 +71,8 @@ def demonstrate_privacy_features():
     print("Original JSON data:")
     print(json.dumps(sensitive_json, indent=2))
     
-    print("\nNow logging the JSON data:")
-    logger.info(f"Processing request: {json.dumps(sensitive_json)}")
+    print("\nNow logging the JSON data (serialized only if the record is emitted):")
+    logger.info("Processing request: %s", RedactedJSON(sensitive_json))
     
     # Demo 3: Exception handling with sensitive data
     print("\n--- Demo 3: Exception Handling with Sensitive Data ---")
@@ -88,15 +95,14 @@ def demonstrate_privacy_features():
         # Get the traceback as a string
         tb_str = traceback.format_exc()
         
-        # Apply the privacy filter to the traceback string
-        privacy_filter = PrivacyLogFilter()
-        # Manually apply the filter to sanitize the error message
-        sanitized_error = str(e)
-        for pattern_name, pattern in privacy_filter.patterns.items():
-            if 'password' in pattern_name.lower() or pattern_name == 'api_key':
+        # Manually apply the password/API key patterns to sanitize the error message,
+        # skipping the regex work entirely if ERROR records would be discarded
+        if logger.isEnabledFor(logging.ERROR):
+            sanitized_error = str(e)
+            for pattern in _PW_PATTERNS:
                 sanitized_error = pattern.sub('[SENSITIVE DATA REDACTED]', sanitized_error)
-        
-        logger.error(f"Error processing request: {sanitized_error}")
+            
+            logger.error("Error processing request: %s", sanitized_error)
     
     # Demo 4: Privacy-aware function context
     print("\n--- Demo 4: Privacy-Aware Function Context ---")
@@ -111,7 +117,7 @@ def demonstrate_privacy_features():
                 # Sanitize the error message
                 original_error = str(e)
                 sanitized_error = "Error in operation"
-                logger.error(f"Error in privacy context: {sanitized_error}")
+                logger.error("Error in privacy context: %s", sanitized_error)
                 # Re-raise with sanitized message
                 raise type(e)(sanitized_error) from None
             finally:
@@ -121,7 +127,7 @@ def demonstrate_privacy_features():
     @privacy_context
     def process_sensitive_data(query, api_key):
         """Example function that processes sensitive data"""
-        logger.info(f"Processing with query: {query}")
+        logger.info("Processing with query: %s", query)
         if "invalid" in query.lower():
             raise ValueError(f"Invalid query contains sensitive data: {query}")
         return {"result": "Processed successfully"}
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration, loaded automatically from the project root.
+
+Command-line flags (e.g. --bind, --timeout in .replit) take precedence.
+"""
+import os
+
+bind = "0.0.0.0:8080"
+timeout = 120
+
+# Worker processes. Each worker opens its own ChromaDB PersistentClient on the
+# same directory, and ChromaDB does not coordinate writes across processes, so
+# keep a single worker unless WEB_CONCURRENCY is set explicitly.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+# Requests spend most of their time waiting on the OpenAI API and on disk, so
+# serve them from a thread pool within the worker rather than one at a time.
+# The threads share the worker's single vector store and HTTP connection pool.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Keep the worker heartbeat files on tmpfs so a slow disk can't stall them
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
@@ -1,82 +1,308 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from flask import Flask, jsonify, request, render_template
+import queue
+import threading
+from flask import Flask, g, jsonify, request, render_template
 from api.routes import bp as api_bp
 from web.routes import bp as web_bp
 from web.monitoring import bp as monitoring_bp
 from services.vector_store import init_vector_store
 from utils.object_storage import get_chroma_storage
-from utils.privacy_log_handler import PrivacyLogFilter
+from utils.privacy_log_handler import PrivacyLogFilter, add_privacy_filter_to_logger
+from utils.json_provider import install_json_provider
+from config import IS_DEPLOYMENT, OPENAI_API_KEY
 
 # Configure logging
 # Determine if we're in a production environment
-is_production = bool(os.environ.get("REPL_DEPLOYMENT", False))
-log_level = logging.DEBUG  # Use DEBUG level for both production and development
+is_production = IS_DEPLOYMENT
+# Default to WARNING in production and INFO in development; set LOG_LEVEL=DEBUG
+# to get the verbose per-request and per-chunk records
+default_log_level = "WARNING" if is_production else "INFO"
+log_level = getattr(logging, os.environ.get("LOG_LEVEL", default_log_level).upper(), logging.INFO)
 log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+log_path = os.environ.get("VKB_LOG_PATH", "app.log")
+# Seconds between flushes of the buffered log file handler, so low-volume
+# INFO/DEBUG records reach app.log promptly instead of waiting for 512 records
+LOG_FLUSH_INTERVAL = 1.0
 
-# Create privacy filter for logs
-privacy_filter = PrivacyLogFilter()
+# Create logger for this module
+logger = logging.getLogger(__name__)
 
-# Configure root logger
-root_logger = logging.getLogger()
-root_logger.setLevel(log_level)
+# Logging is configured by create_app(), not at import time, so processes that
+# merely import this module (e.g. spawned PDF extraction workers re-importing the
+# entry script) don't start a log listener or open the log file
+_logging_configured = False
 
-# Clear any existing handlers
-for handler in root_logger.handlers[:]:
-    root_logger.removeHandler(handler)
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when its bounded queue is full"""
 
-# Create console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter(log_format))
-console_handler.setLevel(log_level)
-console_handler.addFilter(privacy_filter)  # Add privacy filter to console handler
-root_logger.addHandler(console_handler)
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-# Add file handler if not in production
-if not is_production:
-    file_handler = logging.FileHandler('app.log', mode='a')
-    file_handler.setFormatter(logging.Formatter(log_format))
-    file_handler.setLevel(log_level)
-    file_handler.addFilter(privacy_filter)  # Add privacy filter to file handler
-    root_logger.addHandler(file_handler)
+    def enqueue(self, record):
+        # The stock handler's put_nowait() raises queue.Full into handleError(),
+        # which prints a traceback to stderr for every record lost during a burst
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
-# Create logger for this module
-logger = logging.getLogger(__name__)
-logger.setLevel(log_level)
-
-# Log that privacy filter has been applied
-logger.info("Privacy log filter applied to all log handlers")
-
-# Ensure all imported modules log at the appropriate level
-logging.getLogger('api').setLevel(log_level)
-logging.getLogger('web').setLevel(log_level)
-logging.getLogger('services').setLevel(log_level)
-
-# Apply privacy filter to OpenAI client loggers to protect query content
-from utils.privacy_log_handler import add_privacy_filter_to_logger
-add_privacy_filter_to_logger(logging.getLogger('openai'))
-add_privacy_filter_to_logger(logging.getLogger('openai._base_client'))
-add_privacy_filter_to_logger(logging.getLogger('httpx'))
-add_privacy_filter_to_logger(logging.getLogger('httpcore'))
-logger.info("Privacy filter applied to OpenAI client loggers")
-# In production, set SQLAlchemy and other verbose loggers to WARNING level
-if is_production:
-    logging.getLogger('sqlalchemy').setLevel(logging.WARNING)
-    logging.getLogger('werkzeug').setLevel(logging.WARNING)
-else:
-    # In development, we want to see everything
-    logging.getLogger('sqlalchemy').setLevel(logging.INFO)
-    logging.getLogger('werkzeug').setLevel(logging.INFO)
+def configure_logging():
+    """Set up the privacy-filtered, queue-based log handlers once per process"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    # Create privacy filter for logs
+    privacy_filter = PrivacyLogFilter()
+
+    # Configure root logger
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+
+    # Clear any existing handlers
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    # Create console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(log_format))
+    console_handler.setLevel(log_level)
+    console_handler.addFilter(privacy_filter)  # Add privacy filter to console handler
+    output_handlers = [console_handler]
+
+    # Add file handler if not in production
+    if not is_production:
+        # Rotate at 50MB keeping 3 backups so the log can't grow without bound.
+        # VKB_LOG_PATH can point it at a tmpfs such as /dev/shm/app.log.
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, mode='a', maxBytes=50 * 1024 * 1024, backupCount=3
+        )
+        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setLevel(log_level)
+        file_handler.addFilter(privacy_filter)  # Add privacy filter to file handler
+        # Buffer records and write them to the log file in batches of 512, as soon as
+        # a WARNING or worse arrives, or every LOG_FLUSH_INTERVAL seconds, instead of
+        # one write() per record
+        buffered_file_handler = logging.handlers.MemoryHandler(
+            capacity=512, flushLevel=logging.WARNING, target=file_handler
+        )
+        buffered_file_handler.setLevel(log_level)
+        output_handlers.append(buffered_file_handler)
+
+    # Request threads only enqueue records; a background listener thread owns the
+    # console/file handlers, so the stream writes (and the privacy redaction) happen
+    # off the request path
+    log_queue = queue.Queue(maxsize=10000)
+    queue_handler = DroppingQueueHandler(log_queue)
+    root_logger.addHandler(queue_handler)
+    log_listener = logging.handlers.QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    log_listener.start()
+
+    # Flush the buffered file handler on a timer as well as by count and level
+    flush_stop = threading.Event()
+    if not is_production:
+        def _flush_log_file():
+            while not flush_stop.wait(LOG_FLUSH_INTERVAL):
+                buffered_file_handler.flush()
+
+        threading.Thread(target=_flush_log_file, name="log-flush", daemon=True).start()
+
+    def _stop_logging():
+        """Drain the log queue, then write out any buffered log file records"""
+        flush_stop.set()
+        log_listener.stop()
+        if queue_handler.dropped:
+            # The listener has stopped, so report straight to the output handlers
+            record = logger.makeRecord(
+                logger.name, logging.WARNING, __file__, 0,
+                "Dropped %d log records because the log queue was full", (queue_handler.dropped,), None
+            )
+            for handler in output_handlers:
+                handler.handle(record)
+        for handler in output_handlers:
+            handler.flush()
+
+    # Flush anything still queued or buffered when the process exits. Gunicorn
+    # workers exit through sys.exit() on SIGTERM, so this also runs on shutdown.
+    atexit.register(_stop_logging)
+
+    logger.setLevel(log_level)
+
+    # Log that privacy filter has been applied
+    logger.info("Privacy log filter applied to all log handlers")
+
+    # Ensure all imported modules log at the appropriate level
+    logging.getLogger('api').setLevel(log_level)
+    logging.getLogger('web').setLevel(log_level)
+    logging.getLogger('services').setLevel(log_level)
+
+    # Apply privacy filter to OpenAI client loggers to protect query content
+    add_privacy_filter_to_logger(logging.getLogger('openai'))
+    add_privacy_filter_to_logger(logging.getLogger('openai._base_client'))
+    add_privacy_filter_to_logger(logging.getLogger('httpx'))
+    add_privacy_filter_to_logger(logging.getLogger('httpcore'))
+    logger.info("Privacy filter applied to OpenAI client loggers")
+    # In production, set SQLAlchemy and other verbose loggers to WARNING level
+    if is_production:
+        logging.getLogger('sqlalchemy').setLevel(logging.WARNING)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        logging.getLogger('gunicorn.access').setLevel(logging.WARNING)
+    else:
+        # In development, we want to see everything
+        logging.getLogger('sqlalchemy').setLevel(logging.INFO)
+        logging.getLogger('werkzeug').setLevel(logging.INFO)
+
+# Per-request/response logging is for development; production deployments skip
+# it unless VKB_LOG_REQUESTS=1
+LOG_REQUESTS = not is_production or os.environ.get("VKB_LOG_REQUESTS") == "1"
+
+# Request headers included in the per-request debug log
+LOG_HEADERS = ('Content-Type', 'Content-Length', 'X-Request-ID', 'User-Agent')
+
+# CORS headers added to every response
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+}
+
+def _is_api_request() -> bool:
+    """Whether the current request is under /api/, computed once per request"""
+    is_api = g.get('is_api')
+    if is_api is None:
+        is_api = g.is_api = request.path.startswith('/api/')
+    return is_api
+
+# Serializes vector store initialization across request threads
+_vector_store_init_lock = threading.Lock()
+
+# None until initialization has been attempted, then True or False
+_vector_store_initialized = None
+
+# Set once the initialization attempt has finished, whatever its outcome
+_vector_store_ready = threading.Event()
+
+# Seconds API clients are asked to wait before retrying during startup
+STARTUP_RETRY_AFTER = 5
+
+def _initialize_vector_store():
+    """
+    Sync ChromaDB with Object Storage and initialize the vector store, once
+    per process. The outcome is recorded in _vector_store_initialized.
+    """
+    global _vector_store_initialized
+    # Serialize with concurrent callers (startup thread and first requests)
+    with _vector_store_init_lock:
+        if _vector_store_initialized is not None:
+            return
+        try:
+            # Only check for OpenAI key as it's essential
+            if not OPENAI_API_KEY:
+                logger.error("Missing OPENAI_API_KEY")
+                _vector_store_initialized = False
+                return
+
+            # Sync ChromaDB with Replit Object Storage before initializing
+            logger.info("Syncing ChromaDB with Replit Object Storage...")
+            chroma_storage = get_chroma_storage()
+            
+            # Check if we need to modify the sync behavior due to disk space constraints
+            try:
+                # Use skip_local_backup=True in the restore call inside sync method
+                # This helps avoid disk quota issues in constrained environments
+                sync_success, sync_message = chroma_storage.sync_with_object_storage()
+                if sync_success:
+                    logger.info(f"ChromaDB sync successful: {sync_message}")
+                else:
+                    # If we encounter a disk quota error, try to recover by skipping local backup
+                    if sync_message and "Disk quota exceeded" in sync_message:
+                        logger.warning("Disk quota exceeded during sync, attempting recovery...")
+                        # For the specific case where we're restoring, try direct restore without backup
+                        if sync_message and "restore" in sync_message.lower():
+                            logger.info("Attempting direct restore without local backup...")
+                            restore_success, restore_message = chroma_storage.restore_from_object_storage(skip_local_backup=True)
+                            if restore_success:
+                                logger.info(f"Direct restore successful: {restore_message}")
+                                sync_success = True
+                                sync_message = f"Recovery successful: {restore_message}"
+                            else:
+                                logger.error(f"Direct restore failed: {restore_message}")
+                        
+                    logger.warning(f"ChromaDB sync issue: {sync_message}")
+            except Exception as sync_error:
+                logger.error(f"Error during ChromaDB sync: {str(sync_error)}", exc_info=True)
+            
+            logger.info("Starting vector store initialization...")
+            init_vector_store()
+            logger.info("Vector store initialized successfully")
+            _vector_store_initialized = True
+        except Exception as e:
+            logger.error(f"Failed to initialize vector store: {str(e)}", exc_info=True)
+            _vector_store_initialized = False
+            raise  # Always raise in both dev and deployment
+        finally:
+            _vector_store_ready.set()
+
+def _initialize_vector_store_in_background():
+    """Startup thread target; failures are already logged and recorded"""
+    try:
+        _initialize_vector_store()
+    except Exception:
+        pass
+
+# Vector store startup initialization runs once per process
+_vector_store_init_started = False
+
+def start_vector_store_init():
+    """Initialize the vector store in a background thread so startup isn't blocked"""
+    global _vector_store_init_started
+    if _vector_store_init_started:
+        return
+    _vector_store_init_started = True
+    threading.Thread(target=_initialize_vector_store_in_background, name="vector-store-init", daemon=True).start()
+
+# Embedding API warm-up runs once per process, even if create_app() is called twice
+_embedding_warmup_started = False
+
+def _warm_up_embedding_service():
+    """Open the OpenAI client and its pooled connection before the first request"""
+    try:
+        from services.embedding_service import EmbeddingService
+        EmbeddingService.get_instance().warmup()
+    except Exception as e:
+        logger.warning(f"Embedding service warm-up skipped: {str(e)}")
+
+def start_embedding_warmup():
+    """Start the embedding warm-up in a background thread so startup isn't blocked"""
+    global _embedding_warmup_started
+    if _embedding_warmup_started:
+        return
+    _embedding_warmup_started = True
+    threading.Thread(target=_warm_up_embedding_service, name="embedding-warmup", daemon=True).start()
+
+# The application built by create_app(); later calls return the same instance
+_app = None
 
 def create_app():
     """Application factory function"""
+    global _app
+    if _app is not None:
+        return _app
+
+    configure_logging()
+
     logger.info("=== Starting Flask PDF Processing Application ===")
-    logger.info("Debug logs will be written to 'app.log' in the project root directory")
+    logger.info(f"Debug logs will be written to '{log_path}'")
 
     app = Flask(__name__)
     
     # Detect deployment mode
-    is_deployment = bool(os.environ.get("REPL_DEPLOYMENT", False))
+    is_deployment = IS_DEPLOYMENT
     logger.info(f"Deployment mode detected: {is_deployment}")
     
     # Enhanced logging for environment variables in production
@@ -142,24 +368,25 @@ def create_app():
     # Disable Flask's default redirect behavior
     app.url_map.strict_slashes = False
 
+    # Serialize jsonify() responses with orjson
+    install_json_provider(app)
+
     # Add request logging middleware with enhanced privacy filtering
-    @app.before_request
+    # (registered below only when LOG_REQUESTS is set)
     def log_request_info():
-        logger.info("=== New Request ===")
-        logger.info(f"Method: {request.method}")
-        logger.info(f"Path: {request.path}")
-        
-        # Create a copy of headers and remove potentially sensitive ones before logging
-        safe_headers = dict(request.headers)
-        sensitive_headers = ['Authorization', 'Cookie', 'X-API-Key']
-        for header in sensitive_headers:
-            if header in safe_headers:
-                safe_headers[header] = '[REDACTED]'
+        logger.debug("=== New Request ===")
+        logger.info("Method: %s", request.method)
+        logger.info("Path: %s", request.path)
         
-        logger.info(f"Headers: {safe_headers}")
+        # Header dumps are DEBUG-only, so the dict isn't built on every request.
+        # Only allow-listed headers are logged, which keeps credentials
+        # (Authorization, Cookie, X-API-Key) out of the log entirely.
+        if logger.isEnabledFor(logging.DEBUG):
+            logged_headers = {h: request.headers[h] for h in LOG_HEADERS if h in request.headers}
+            logger.debug("Headers: %s", logged_headers)
         
         # Filter and log request parameters based on endpoint type
-        if request.path.startswith('/api/'):
+        if _is_api_request():
             # API requests need more careful filtering
             
             # For query endpoint, completely redact request data
@@ -174,10 +401,10 @@ def create_app():
                 
                 # Log basic form or query param info without their values
                 if request.args:
-                    logger.info(f"Request contains {len(request.args)} URL parameters (values not logged)")
+                    logger.info("Request contains %d URL parameters (values not logged)", len(request.args))
                 
                 if request.form:
-                    logger.info(f"Request contains {len(request.form)} form fields (values not logged)")
+                    logger.info("Request contains %d form fields (values not logged)", len(request.form))
                 
                 # For file uploads, log only metadata
                 if request.files:
@@ -188,68 +415,37 @@ def create_app():
                                 "filename": file.filename,
                                 "content_type": file.content_type
                             }
-                    logger.info(f"Request files: {file_info}")
+                    logger.info("Request files: %s", file_info)
         else:
             # For non-API routes, we can be less restrictive but still filter
             # Only log existence of parameters, not their values
             if request.args:
-                logger.info(f"Request contains URL parameters: {list(request.args.keys())}")
+                logger.info("Request contains URL parameters: %s", list(request.args.keys()))
             
             if request.form:
-                logger.info(f"Request contains form parameters: {list(request.form.keys())}")
+                logger.info("Request contains form parameters: %s", list(request.form.keys()))
                 
             if request.files:
-                logger.info(f"Request contains files: {list(request.files.keys())}")
+                logger.info("Request contains files: %s", list(request.files.keys()))
+
+    if LOG_REQUESTS:
+        app.before_request(log_request_info)
 
-    # Defer vector store initialization until first request
+    # Until the startup initialization finishes, API requests get a 503 asking the
+    # client to retry, and other requests wait for it
     @app.before_request
     def initialize_vector_store():
-        if not hasattr(app, '_vector_store_initialized'):
-            try:
-                # Only check for OpenAI key as it's essential
-                if not os.environ.get("OPENAI_API_KEY"):
-                    logger.error("Missing OPENAI_API_KEY")
-                    app._vector_store_initialized = False
-                    return
-
-                # Sync ChromaDB with Replit Object Storage before initializing
-                logger.info("Syncing ChromaDB with Replit Object Storage...")
-                chroma_storage = get_chroma_storage()
-                
-                # Check if we need to modify the sync behavior due to disk space constraints
-                try:
-                    # Use skip_local_backup=True in the restore call inside sync method
-                    # This helps avoid disk quota issues in constrained environments
-                    sync_success, sync_message = chroma_storage.sync_with_object_storage()
-                    if sync_success:
-                        logger.info(f"ChromaDB sync successful: {sync_message}")
-                    else:
-                        # If we encounter a disk quota error, try to recover by skipping local backup
-                        if sync_message and "Disk quota exceeded" in sync_message:
-                            logger.warning("Disk quota exceeded during sync, attempting recovery...")
-                            # For the specific case where we're restoring, try direct restore without backup
-                            if sync_message and "restore" in sync_message.lower():
-                                logger.info("Attempting direct restore without local backup...")
-                                restore_success, restore_message = chroma_storage.restore_from_object_storage(skip_local_backup=True)
-                                if restore_success:
-                                    logger.info(f"Direct restore successful: {restore_message}")
-                                    sync_success = True
-                                    sync_message = f"Recovery successful: {restore_message}"
-                                else:
-                                    logger.error(f"Direct restore failed: {restore_message}")
-                            
-                        logger.warning(f"ChromaDB sync issue: {sync_message}")
-                except Exception as sync_error:
-                    logger.error(f"Error during ChromaDB sync: {str(sync_error)}", exc_info=True)
-                
-                logger.info("Starting vector store initialization...")
-                init_vector_store()
-                logger.info("Vector store initialized successfully")
-                app._vector_store_initialized = True
-            except Exception as e:
-                logger.error(f"Failed to initialize vector store: {str(e)}", exc_info=True)
-                app._vector_store_initialized = False
-                raise  # Always raise in both dev and deployment
+        if not _vector_store_ready.is_set():
+            if _is_api_request():
+                return (jsonify({"error": "Service is starting up, please retry shortly"}), 503,
+                        {"Retry-After": str(STARTUP_RETRY_AFTER)})
+            _initialize_vector_store()
+        # Initialization has been attempted, so later requests don't need this hook.
+        # Swap in a new list rather than removing in place, since other request
+        # threads may be iterating the current one.
+        funcs = app.before_request_funcs.get(None, [])
+        if initialize_vector_store in funcs:
+            app.before_request_funcs[None] = [f for f in funcs if f is not initialize_vector_store]
 
     # Register blueprints
     logger.info("Registering blueprints...")
@@ -263,13 +459,16 @@ def create_app():
     # Add CORS headers to all responses
     @app.after_request
     def after_request(response):
-        logger.info("=== Processing Response ===")
-        logger.info(f"Status Code: {response.status_code}")
-        logger.info(f"Response Headers: {dict(response.headers)}")
+        if LOG_REQUESTS:
+            logger.debug("=== Processing Response ===")
+            logger.info("Status Code: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response Headers: %s", dict(response.headers))
 
         # For API routes, ensure JSON response
-        if request.path.startswith('/api/'):
-            logger.info("API route detected, ensuring JSON response")
+        if _is_api_request():
+            if LOG_REQUESTS:
+                logger.info("API route detected, ensuring JSON response")
             # Only set Content-Type if it's not already set (for file uploads etc)
             if 'Content-Type' not in response.headers:
                 response.headers['Content-Type'] = 'application/json'
@@ -278,39 +477,48 @@ def create_app():
             response.headers.pop('Location', None)
             response.autocorrect_location_header = False
 
-        # Add CORS headers for all responses
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        # Add CORS headers for all responses (update() replaces any values a route already set)
+        response.headers.update(CORS_HEADERS)
         return response
 
     # Error handlers for API routes
     @app.errorhandler(404)
     def not_found(error):
         logger.error(f"404 error for path: {request.path}")
-        if request.path.startswith('/api/'):
+        if _is_api_request():
             return jsonify({"error": "Resource not found"}), 404
         return render_template('error.html', error=error), 404
 
     @app.errorhandler(500)
     def internal_error(error):
         logger.error(f"500 error for path: {request.path}", exc_info=True)
-        if request.path.startswith('/api/'):
+        if _is_api_request():
             return jsonify({"error": "Internal server error"}), 500
         return render_template('error.html', error=error), 500
 
-    # Log all registered routes
-    logger.info("Registered routes:")
-    for rule in app.url_map.iter_rules():
-        logger.info(f"Route: {rule.rule} Methods: {rule.methods}")
+    # Log all registered routes (opt-in, to keep startup quiet and fast)
+    if os.environ.get("VKB_LOG_ROUTES") == "1":
+        logger.info("Registered routes:")
+        for rule in app.url_map.iter_rules():
+            logger.info(f"Route: {rule.rule} Methods: {rule.methods}")
 
     # We've removed the shutdown backup hook as it's not needed with our improved backup system
 
+    # Sync and load the vector store in the background as soon as the app is
+    # created, instead of making the first request pay for it
+    start_vector_store_init()
+
+    # Warm up the embedding client in the background
+    start_embedding_warmup()
+
     logger.info("Flask application configured successfully")
+    _app = app
     return app
 
-app = create_app()
-
 if __name__ == "__main__":
+    # Gunicorn builds the app through 'main:create_app()'; only a direct run creates
+    # it here, so importing this module (as spawned worker processes do) has no
+    # side effects
+    app = create_app()
     logger.info("Starting Flask application on port 8080")
     app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file
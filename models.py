@@ -3,6 +3,9 @@ from typing import Dict, Optional
 from pydantic import BaseModel
 
 class Document:
+    # No per-instance __dict__; the vector store keeps one Document per stored file
+    __slots__ = ('id', 'content', 'metadata', 'created_at')
+
     def __init__(self, id: str, content: str, metadata: Dict, created_at: Optional[datetime] = None):
         self.id = id
         self.content = content
@@ -16,6 +19,7 @@ class VectorSearchResult(BaseModel):
     metadata: Dict
 
     model_config = {
+        "frozen": True,  # Results are built once in VectorStore.search and never modified
         "json_schema_extra": {
             "examples": [{
                 "document_id": "123e4567-e89b-12d3-a456-426614174000",
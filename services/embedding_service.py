@@ -1,14 +1,197 @@
+import functools
+import hashlib
 import logging
 import openai
 import os
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from config import OPENAI_API_KEY, EMBEDDING_MODEL
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+# tiktoken is used to keep inputs under the model's token limit; without it
+# over-long inputs are left for the API to reject
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+# Maximum number of texts sent in one embeddings request (the API accepts up to 2048)
+EMBEDDING_BATCH_SIZE = 256
+
+# Maximum number of sub-batch requests in flight at once for one call, to stay
+# within the API's rate limits
+EMBEDDING_MAX_CONCURRENCY = 8
+
+# Process-wide cap on sub-batch requests in flight, shared by all concurrent
+# uploads so their combined burst stays within the rate limit. Single-text
+# (query) requests don't take a slot, so searches never queue behind ingestion
+_api_slots = threading.BoundedSemaphore(EMBEDDING_MAX_CONCURRENCY)
+
+# Retries for rate-limited (429) and failed requests. The OpenAI SDK backs off
+# exponentially with jitter and honours Retry-After; the default of 2 is easily
+# exhausted when several sub-batches hit the rate limit together
+OPENAI_MAX_RETRIES = 5
+
+# Maximum input length accepted by the embeddings endpoint, in tokens
+MAX_EMBEDDING_TOKENS = 8191
+
+# Number of recent query embeddings kept in memory, so repeated searches skip the API call
+EMBEDDING_CACHE_SIZE = 2048
+
+# Number of recent document-chunk embeddings kept in memory. Chunks get their own
+# LRU so one large upload can't evict the cached query embeddings
+EMBEDDING_CHUNK_CACHE_SIZE = 2048
+
+# Optional SQLite file that keeps cached embeddings across restarts. Off unless
+# the path is set, since it stores vectors derived from queries on disk
+EMBEDDING_CACHE_PATH = os.environ.get("VKB_EMBEDDING_CACHE_PATH")
+
+# Disk cache entries older than this are ignored and overwritten
+EMBEDDING_CACHE_TTL = int(os.environ.get("VKB_EMBEDDING_CACHE_TTL", 30 * 24 * 3600))
+
+
+@functools.cache
+def _get_encoding():
+    """Get the tokenizer for EMBEDDING_MODEL, loaded on first use; None if it can't be loaded"""
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except Exception as e:
+        # tiktoken downloads its BPE file on first use. Cache the failure rather than
+        # retrying the download on every input, and send inputs untruncated
+        logger.warning(f"Tokenizer for {EMBEDDING_MODEL} unavailable, embedding inputs won't be truncated: {str(e)}")
+        return None
+
+
+def truncate_to_token_limit(text: str) -> str:
+    """
+    Cut text to MAX_EMBEDDING_TOKENS tokens so the API doesn't reject it.
+
+    A token covers at least one UTF-8 byte, so texts that short can't exceed
+    the limit and are returned without tokenizing.
+    """
+    if not HAS_TIKTOKEN or len(text) * 4 <= MAX_EMBEDDING_TOKENS:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        return text
+    # Special-token strings such as <|endoftext|> in a document are ordinary text here
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= MAX_EMBEDDING_TOKENS:
+        return text
+    logger.warning("Truncating embedding input from %d to %d tokens", len(tokens), MAX_EMBEDDING_TOKENS)
+    return encoding.decode(tokens[:MAX_EMBEDDING_TOKENS])
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, text hash).
+
+    Embeddings are stored as packed float32 bytes: an in-memory LRU in front of
+    an optional SQLite table. Only the hash of the text is kept, never the text.
+    """
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE, path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 ttl: int = EMBEDDING_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS emb(key BLOB PRIMARY KEY, vec BLOB, created_at REAL)"
+                )
+                # Expired rows are never read again; drop them so the file doesn't only grow
+                pruned = self._db.execute("DELETE FROM emb WHERE created_at<?", (time.time() - ttl,)).rowcount
+                self._db.commit()
+                if pruned:
+                    logger.info(f"Pruned {pruned} expired entries from the embedding disk cache")
+                logger.info(f"Using persistent embedding cache at {path}")
+            except sqlite3.Error as e:
+                # The disk tier is an optimization; run with the memory tier alone
+                logger.warning(f"Embedding disk cache unavailable: {str(e)}")
+                self._db = None
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(f"{EMBEDDING_MODEL}\0{text}".encode(), digest_size=16).digest()
+
+    def get(self, key: bytes, remember: bool = True) -> Optional[List[float]]:
+        """Look up an embedding; a disk hit is added to the memory tier only if remember is set"""
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+            elif self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT vec FROM emb WHERE key=? AND created_at>=?", (key, time.time() - self.ttl)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding disk cache read failed: {str(e)}")
+                    row = None
+                if row is not None:
+                    vec = row[0]
+                    if remember:
+                        self._remember(key, vec)
+        return array('f', vec).tolist() if vec is not None else None
+
+    def put(self, key: bytes, embedding: List[float]) -> None:
+        self.put_many([(key, embedding)])
+
+    def put_many(self, items: List[Tuple[bytes, List[float]]], remember: bool = True) -> None:
+        """
+        Store several embeddings in one disk transaction. With remember unset
+        they go to the disk tier only, leaving the memory tier as it is.
+        """
+        rows = [(key, array('f', embedding).tobytes()) for key, embedding in items]
+        if not rows:
+            return
+        with self._lock:
+            if remember:
+                for key, vec in rows:
+                    self._remember(key, vec)
+            if self._db is not None:
+                try:
+                    now = time.time()
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO emb(key, vec, created_at) VALUES (?, ?, ?)",
+                        [(key, vec, now) for key, vec in rows]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding disk cache write failed: {str(e)}")
+
+    def _remember(self, key: bytes, vec: bytes) -> None:
+        # Caller holds self._lock
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        if len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+
 class EmbeddingService:
+    _instance = None
+    _instance_lock = threading.Lock()
+
     def __init__(self):
         logger.info("Initializing EmbeddingService")
+
+        # Process-wide caches (the service is a singleton): query embeddings in
+        # memory plus the optional disk tier, and a separate memory LRU for
+        # document chunks whose disk entries share that same disk tier
+        self._cache = EmbeddingCache()
+        self._chunk_cache = EmbeddingCache(maxsize=EMBEDDING_CHUNK_CACHE_SIZE, path=None)
         
         # Import here to avoid circular imports
         from config import IS_DEPLOYMENT
@@ -22,9 +205,37 @@ class EmbeddingService:
                 raise ValueError("OPENAI_API_KEY not configured correctly")
         else:
             self.api_available = True
-            openai.api_key = OPENAI_API_KEY
+            # Reuse the shared keep-alive HTTP client instead of a new TLS handshake per call
+            self.client = openai.OpenAI(
+                api_key=OPENAI_API_KEY,
+                http_client=get_http_client(),
+                max_retries=OPENAI_MAX_RETRIES
+            )
             logger.info(f"Using embedding model: {EMBEDDING_MODEL}")
 
+    @classmethod
+    def get_instance(cls) -> 'EmbeddingService':
+        """Get the shared EmbeddingService, so the client and cache are built once per process"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = EmbeddingService()
+        return cls._instance
+
+    def warmup(self):
+        """
+        Send a one-word embeddings request so the shared HTTP pool holds an
+        open TLS connection to the API before the first real request.
+        """
+        if not getattr(self, 'api_available', False):
+            return
+        try:
+            self.client.embeddings.create(input=["warmup"], model=EMBEDDING_MODEL)
+            logger.info("Embedding API connection warmed up")
+        except Exception as e:
+            # Warm-up is best effort; the first real request will simply pay the connection cost
+            logger.warning(f"Embedding API warm-up failed: {str(e)}")
+
     def generate_embedding(self, text: str):
         try:
             if not hasattr(self, 'api_available') or not self.api_available:
@@ -32,25 +243,28 @@ class EmbeddingService:
                 # Return a small dummy embedding in deployment mode
                 return [0.0] * 10
                 
-            if not text.strip():
+            # isspace() tests for blank input without copying the text as strip() does
+            if not text or text.isspace():
                 logger.error("Empty text provided for embedding generation")
                 return None
 
+            text = truncate_to_token_limit(text)
+
             # Privacy-enhanced logging - don't log text content
-            text_length = len(text) if text else 0
-            logger.info(f"Generating embedding for text of length: {text_length} chars")
+            logger.info("Generating embedding for text of length: %d chars", len(text))
             
             # No text preview to avoid logging content
-            logger.debug("OpenAI API configuration status:")
-            logger.debug(f"API Key configured: {bool(openai.api_key)}")
-            logger.debug(f"Using model: {EMBEDDING_MODEL}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("OpenAI API configuration status:")
+                logger.debug("API Key configured: %s", bool(self.client.api_key))
+                logger.debug("Using model: %s", EMBEDDING_MODEL)
 
             # Log API call without content details
             logger.info("Making API call to OpenAI embeddings endpoint...")
             
             # Use exception handling to prevent embedding content from appearing in error logs
             try:
-                response = openai.embeddings.create(
+                response = self.client.embeddings.create(
                     input=[text],  # Input must be a list of strings
                     model=EMBEDDING_MODEL
                 )
@@ -64,7 +278,7 @@ class EmbeddingService:
             logger.info("Successfully received response from OpenAI API")
 
             embedding = response.data[0].embedding
-            logger.info(f"Generated embedding of dimension {len(embedding)}")
+            logger.info("Generated embedding of dimension %d", len(embedding))
             return embedding
 
         except openai.APIError as api_error:
@@ -79,4 +293,129 @@ class EmbeddingService:
             logger.error(f"Unexpected error generating embedding: {str(e)}")
             logger.error(f"Exception type: {type(e)}")
             logger.error(f"Exception details: {str(e.__dict__)}")
-            raise Exception(f"Unexpected error: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Unexpected error: {str(e)}")
+
+    def generate_query_embedding(self, text: str) -> Optional[List[float]]:
+        """
+        Generate the embedding for a search query, reusing the result for a
+        query that was recently embedded.
+        """
+        if not getattr(self, 'api_available', False):
+            return self.generate_embedding(text)
+
+        key = self._cache.key(text)
+        embedding = self._cache.get(key)
+        if embedding is None:
+            embedding = self.generate_embedding(text)
+            if embedding is not None:
+                self._cache.put(key, embedding)
+        return embedding
+
+    def _get_chunk_embedding(self, key: bytes) -> Optional[List[float]]:
+        """Look up a document-chunk embedding in the chunk LRU, then the shared disk tier"""
+        embedding = self._chunk_cache.get(key)
+        if embedding is None:
+            embedding = self._cache.get(key, remember=False)
+            if embedding is not None:
+                self._chunk_cache.put(key, embedding)
+        return embedding
+
+    def _embed_batch(self, batch):
+        """Send one sub-batch of (key, positions, text) entries to the embeddings endpoint"""
+        batch_texts = [text for _, _, text in batch]
+
+        # Use exception handling to prevent embedding content from appearing in error logs
+        try:
+            with _api_slots:
+                return self.client.embeddings.create(
+                    input=batch_texts,
+                    model=EMBEDDING_MODEL
+                )
+        except Exception as api_error:
+            # Privacy-enhanced error handling - don't include text in error messages
+            error_message = str(api_error)
+            sanitized_error = error_message
+            for text in batch_texts:
+                if len(text) > 10 and text[:10] in sanitized_error:
+                    sanitized_error = sanitized_error.replace(text, "[TEXT CONTENT REDACTED]")
+            if sanitized_error != error_message:
+                raise Exception(f"API error (sanitized): {sanitized_error}")
+            raise
+
+    def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for many texts with one API call per sub-batch.
+
+        Returns embeddings in input order. Empty texts get None, matching
+        generate_embedding.
+        """
+        try:
+            if not hasattr(self, 'api_available') or not self.api_available:
+                logger.warning("Embedding API not available - returning dummy embeddings")
+                # Return small dummy embeddings in deployment mode
+                return [[0.0] * 10 for _ in texts]
+
+            embeddings: List[Optional[List[float]]] = [None] * len(texts)
+            non_empty = [(i, text) for i, text in enumerate(texts) if text and not text.isspace()]
+            if len(non_empty) < len(texts):
+                logger.error(f"{len(texts) - len(non_empty)} empty texts provided for embedding generation")
+
+            # Serve cached texts directly; only misses go to the API, and a text
+            # repeated within this call is sent once and copied to every position
+            pending = {}
+            for i, text in non_empty:
+                key = self._cache.key(text)
+                if key in pending:
+                    pending[key][1].append(i)
+                    continue
+                cached = self._get_chunk_embedding(key)
+                if cached is not None:
+                    embeddings[i] = cached
+                else:
+                    pending[key] = (truncate_to_token_limit(text), [i])
+            indexed_texts = [(key, positions, text) for key, (text, positions) in pending.items()]
+
+            # Privacy-enhanced logging - don't log text content
+            logger.info(f"Generating embeddings for {len(indexed_texts)} texts in batches of {EMBEDDING_BATCH_SIZE} "
+                        f"({len(non_empty) - len(indexed_texts)} cached or repeated)")
+
+            batches = [indexed_texts[start:start + EMBEDDING_BATCH_SIZE]
+                       for start in range(0, len(indexed_texts), EMBEDDING_BATCH_SIZE)]
+
+            # Sub-batches are independent, so large documents send several requests
+            # at once over the shared connection pool instead of one after another
+            if len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(batches), EMBEDDING_MAX_CONCURRENCY)) as executor:
+                    responses = list(executor.map(self._embed_batch, batches))
+            else:
+                responses = [self._embed_batch(batch) for batch in batches]
+
+            new_entries = []
+            for batch, response in zip(batches, responses):
+                # The API returns one item per input, tagged with its position in the batch
+                for item in response.data:
+                    key, positions, _ = batch[item.index]
+                    new_entries.append((key, item.embedding))
+                    for i in positions:
+                        embeddings[i] = item.embedding
+
+            # One disk transaction for the whole call, kept out of the query LRU
+            self._chunk_cache.put_many(new_entries)
+            self._cache.put_many(new_entries, remember=False)
+
+            logger.info(f"Generated {len(indexed_texts)} embeddings")
+            return embeddings
+
+        except openai.APIError as api_error:
+            logger.error(f"OpenAI API Error: {api_error}")
+            logger.error(f"Error details: {str(api_error.__dict__)}")
+            raise Exception(f"OpenAI API error: {str(api_error)}")
+        except openai.APIConnectionError as conn_error:
+            logger.error(f"Connection error with OpenAI API: {conn_error}")
+            logger.error(f"Connection error details: {str(conn_error.__dict__)}")
+            raise Exception(f"Connection error: {str(conn_error)}")
+        except Exception as e:
+            logger.error(f"Unexpected error generating embeddings: {str(e)}")
+            logger.error(f"Exception type: {type(e)}")
+            logger.error(f"Exception details: {str(e.__dict__)}")
+            raise Exception(f"Unexpected error: {str(e)}")
@@ -0,0 +1,45 @@
+import logging
+import threading
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool limits for outbound HTTPS calls (OpenAI API)
+MAX_KEEPALIVE_CONNECTIONS = 32
+MAX_CONNECTIONS = 64
+REQUEST_TIMEOUT = 30.0
+# Retries for failed connection attempts (the OpenAI SDK retries failed responses itself)
+CONNECT_RETRIES = 3
+
+# HTTP/2 lets concurrent requests (e.g. embedding sub-batches) share one
+# connection; it needs the h2 package, otherwise the client stays on HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Process-wide HTTP client so keep-alive connections are reused across requests
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> httpx.Client:
+    """Get the shared httpx.Client instance"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                logger.info(f"Creating shared HTTP client with keep-alive connection pool (HTTP/2: {HAS_HTTP2})")
+                # Limits go on the transport; httpx ignores the client's limits when a transport is given
+                _http_client = httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        limits=httpx.Limits(
+                            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                            max_connections=MAX_CONNECTIONS
+                        ),
+                        retries=CONNECT_RETRIES,
+                        http2=HAS_HTTP2
+                    ),
+                    timeout=REQUEST_TIMEOUT
+                )
+    return _http_client
@@ -2,10 +2,12 @@ import logging
 import time
 import traceback
 import gc
+import multiprocessing
 import psutil
 import os
 import fitz  # PyMuPDF
-from typing import Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional
 from io import BytesIO
 from contextlib import contextmanager
 import signal
@@ -28,22 +30,132 @@ def timeout(seconds):
     finally:
         signal.alarm(0)
 
+# Plain-text extraction flags: PyMuPDF's defaults for "text" minus ligature
+# preservation, so ligatures come out as ordinary letters ("fi" rather than
+# U+FB01) that match typed queries. Every other default is kept.
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+# psutil handle for this process, created on first use rather than per memory check
+_process = None
+
+def _get_process() -> psutil.Process:
+    """Get the psutil.Process for the current process"""
+    global _process
+    if _process is None:
+        _process = psutil.Process(os.getpid())
+    return _process
+
+# PDF bytes held by each extraction worker process, set once by the pool
+# initializer so page ranges don't each carry a copy of the document
+_worker_file_content = None
+
+def _init_extract_worker(file_content: bytes) -> None:
+    """Store the PDF bytes in a newly started extraction worker"""
+    global _worker_file_content
+    _worker_file_content = file_content
+
+def _extract_page_range(page_range: Tuple[int, int]) -> List[str]:
+    """
+    Extract the text of pages [start, stop) in a worker process.
+
+    Each worker opens its own copy of the document, since PyMuPDF documents
+    can't be shared across processes (or used from several threads).
+    """
+    start, stop = page_range
+    texts = []
+    with fitz.open(stream=_worker_file_content, filetype="pdf") as pdf_document:
+        for page_num in range(start, stop):
+            try:
+                texts.append(pdf_document[page_num].get_text("text", flags=TEXT_FLAGS))
+            except Exception as page_error:
+                logger.error(f"Error extracting text from page {page_num + 1}: {str(page_error)}")
+                texts.append("")
+    return texts
+
 class PDFProcessor:
     MAX_MEMORY_PER_PAGE = 2000 * 1024 * 1024  # 2GB per page limit
+    BASE_MEMORY = 250 * 1024 * 1024  # 250MB allowance for base application
     PAGE_TIMEOUT = 30  # 30 seconds timeout per page
+    PAGE_BATCH_SIZE = 200  # Pages extracted before the document is reopened to release MuPDF's caches
+    PARALLEL_MIN_PAGES = 64  # Smaller documents aren't worth starting worker processes for
+    MAX_EXTRACT_WORKERS = 4  # Upper bound on extraction processes per document
+
+    @staticmethod
+    def extract_pages_parallel(file_content: bytes, total_pages: int) -> Tuple[Optional[List[str]], Optional[str]]:
+        """
+        Extract page texts using a pool of worker processes.
+        Returns: Tuple[page_texts, error_message]. Both are None when only one
+        CPU is available or the pool fails, so the caller falls back to serial
+        extraction.
+        """
+        workers = min(os.cpu_count() or 1, PDFProcessor.MAX_EXTRACT_WORKERS)
+        if workers < 2:
+            return None, None
+
+        # Ranges are at most PAGE_BATCH_SIZE pages, and each one opens its own copy
+        # of the document, so MuPDF's caches stay bounded as in the serial loop
+        step = min(-(-total_pages // workers), PDFProcessor.PAGE_BATCH_SIZE)  # ceiling division
+        ranges = [(start, min(start + step, total_pages)) for start in range(0, total_pages, step)]
+        logger.info(f"Extracting {total_pages} pages in {len(ranges)} batches with {workers} worker processes")
+
+        try:
+            # spawn rather than fork: the web worker has running threads (request
+            # handlers, the log listener) that must not be duplicated mid-operation.
+            # The PDF bytes go to each worker once, through the initializer
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_extract_worker,
+                                     initargs=(file_content,)) as executor:
+                text_content = []
+                for (start, stop), texts in zip(ranges, executor.map(_extract_page_range, ranges)):
+                    text_content.extend(texts)
+                    PDFProcessor.log_memory_usage(f"after_pages_{start + 1}-{stop}", logging.DEBUG)
+
+                    # The collected page texts live in this process; apply the same
+                    # limit as the serial loop after every batch
+                    error_msg = PDFProcessor.check_memory_limit(f"after extracting pages {start + 1}-{stop}")
+                    if error_msg:
+                        executor.shutdown(cancel_futures=True)
+                        return None, error_msg
+                return text_content, None
+        except Exception as e:
+            # A broken pool, a pickling error or a sandbox that can't start processes
+            # shouldn't fail the upload; the serial loop can still extract the pages
+            logger.warning(f"Parallel PDF extraction failed, falling back to serial extraction: {str(e)}")
+            return None, None
 
     @staticmethod
     def check_memory():
         """Check current memory usage"""
-        process = psutil.Process(os.getpid())
-        memory_info = process.memory_info()
+        memory_info = _get_process().memory_info()
         return memory_info.rss, memory_info.vms
 
     @staticmethod
-    def log_memory_usage(operation: str = ""):
-        """Log current memory usage"""
+    def check_memory_limit(context: str) -> Optional[str]:
+        """
+        Check memory usage against MAX_MEMORY_PER_PAGE, collecting garbage once
+        before giving up. Returns an error message if the limit is exceeded.
+        """
+        limit = PDFProcessor.MAX_MEMORY_PER_PAGE + PDFProcessor.BASE_MEMORY
+        rss, _ = PDFProcessor.check_memory()
+        if rss <= limit:
+            return None
+        logger.warning(f"Memory usage too high {context}")
+        PDFProcessor.force_garbage_collection()
+        rss, _ = PDFProcessor.check_memory()
+        if rss <= limit:
+            return None
+        error_msg = f"Memory limit exceeded ({rss / 1024 / 1024:.2f}MB)"
+        logger.error(error_msg)
+        return error_msg
+
+    @staticmethod
+    def log_memory_usage(operation: str = "", level: int = logging.INFO):
+        """Log current memory usage (skipped entirely if the level is disabled)"""
+        if not logger.isEnabledFor(level):
+            return
         rss, vms = PDFProcessor.check_memory()
-        logger.info(f"Memory usage [{operation}] - RSS: {rss / 1024 / 1024:.2f}MB, VMS: {vms / 1024 / 1024:.2f}MB")
+        logger.log(level, "Memory usage [%s] - RSS: %.2fMB, VMS: %.2fMB", operation, rss / 1024 / 1024, vms / 1024 / 1024)
 
     @staticmethod
     def force_garbage_collection():
@@ -71,36 +183,55 @@ class PDFProcessor:
             logger.info(f"PDF loaded successfully. Number of pages: {total_pages}")
 
             text_content = []
+            if total_pages >= PDFProcessor.PARALLEL_MIN_PAGES:
+                # The workers open their own copies; don't hold this one open meanwhile
+                pdf_document.close()
+                parallel_content, error_msg = PDFProcessor.extract_pages_parallel(file_content, total_pages)
+                if error_msg:
+                    memory_pdf.close()
+                    return None, error_msg
+                if parallel_content is None:
+                    # Reopen the document for the serial fallback
+                    pdf_document = fitz.open(stream=file_content, filetype="pdf")
+                else:
+                    # Blank pages become "", as in the serial loop below
+                    text_content = [page_text if page_text and not page_text.isspace() else ""
+                                    for page_text in parallel_content]
+                    empty_pages = text_content.count("")
+                    if empty_pages:
+                        logger.warning(f"{empty_pages} pages appear to be empty or unreadable")
 
-            for page_num in range(total_pages):
+            # Serial extraction covers every page unless the parallel path already did
+            for page_num in range(len(text_content), total_pages):
                 chunk_start = time.time()
-                logger.info(f"Processing page {page_num + 1}/{total_pages}...")
-                PDFProcessor.log_memory_usage(f"before_page_{page_num + 1}")
+
+                # MuPDF keeps parsed resources (fonts, images, page tree) for the life
+                # of the document; reopening it between page batches bounds that growth
+                if page_num and page_num % PDFProcessor.PAGE_BATCH_SIZE == 0:
+                    pdf_document.close()
+                    pdf_document = fitz.open(stream=file_content, filetype="pdf")
+                    logger.info(f"Reopened PDF after {page_num} pages to release cached resources")
+
+                logger.debug("Processing page %d/%d...", page_num + 1, total_pages)
+                PDFProcessor.log_memory_usage(f"before_page_{page_num + 1}", logging.DEBUG)
 
                 # Check memory limit before processing page
-                rss, _ = PDFProcessor.check_memory()
-                base_memory = 250 * 1024 * 1024  # 250MB allowance for base application
-                if rss > (PDFProcessor.MAX_MEMORY_PER_PAGE + base_memory):
-                    logger.warning(f"Memory usage too high before processing page {page_num + 1}")
-                    PDFProcessor.force_garbage_collection()
-                    rss, _ = PDFProcessor.check_memory()
-                    if rss > (PDFProcessor.MAX_MEMORY_PER_PAGE + base_memory):
-                        error_msg = f"Memory limit exceeded ({rss / 1024 / 1024:.2f}MB)"
-                        logger.error(error_msg)
-                        return None, error_msg
+                error_msg = PDFProcessor.check_memory_limit(f"before processing page {page_num + 1}")
+                if error_msg:
+                    return None, error_msg
 
                 try:
                     # Get page and extract text
                     page = pdf_document[page_num]
-                    logger.debug(f"Page {page_num + 1} loaded into memory")
-                    page_text = page.get_text()
+                    logger.debug("Page %d loaded into memory", page_num + 1)
+                    page_text = page.get_text("text", flags=TEXT_FLAGS)
 
-                    if not page_text.strip():
+                    if not page_text or page_text.isspace():
                         logger.warning(f"Page {page_num + 1} appears to be empty or unreadable")
                         text_content.append("")
                     else:
                         text_content.append(page_text)
-                        logger.info(f"Extracted text from page {page_num + 1}, length: {len(page_text)} chars")
+                        logger.debug("Extracted text from page %d, length: %d chars", page_num + 1, len(page_text))
 
                 except Exception as page_error:
                     logger.error(f"Error extracting text from page {page_num + 1}: {str(page_error)}\n{traceback.format_exc()}")
@@ -108,24 +239,31 @@ class PDFProcessor:
                     continue
 
                 finally:
-                    # Clean up page resources
+                    # Clean up page resources. Dropping the reference frees the page
+                    # right away; a full gc.collect() per page cost more than the
+                    # extraction itself and now only runs when memory is over the limit
                     if 'page' in locals():
                         del page
-                    PDFProcessor.force_garbage_collection()
-                    PDFProcessor.log_memory_usage(f"after_page_{page_num + 1}")
+                    PDFProcessor.log_memory_usage(f"after_page_{page_num + 1}", logging.DEBUG)
 
                 chunk_time = time.time() - chunk_start
-                logger.info(f"Page {page_num + 1} processing completed in {chunk_time:.2f}s")
+                logger.debug("Page %d processing completed in %.2fs", page_num + 1, chunk_time)
 
-            # Close the PDF document
-            pdf_document.close()
+            # Close the PDF document (already closed if the workers extracted every page)
+            if not pdf_document.is_closed:
+                pdf_document.close()
             memory_pdf.close()
 
-            full_text = "\n".join(text_content)
-            if not full_text.strip():
+            # Blank pages were stored as "", so the document is empty exactly when
+            # no page has text; check that before building the joined string
+            if not any(text_content):
                 logger.warning("No text content found in PDF")
                 return None, "No text content found in PDF"
 
+            # Release the per-page strings as soon as the joined text exists
+            full_text = "\n".join(text_content)
+            del text_content
+
             total_time = time.time() - start_time
             logger.info(f"Successfully extracted text, total length: {len(full_text)} chars, took {total_time:.2f}s")
             PDFProcessor.log_memory_usage("end")
@@ -2,8 +2,10 @@ import logging
 import os
 import sqlite3
 import chromadb
+import threading
 import time
 import traceback
+from itertools import islice
 from chromadb.api.types import EmbeddingFunction
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
@@ -40,18 +42,8 @@ class CustomEmbeddingFunction(EmbeddingFunction):
     def __call__(self, input: List[str]) -> List[List[float]]:
         try:
             logger.info(f"Processing {len(input)} text chunks for embedding")
-            embeddings = []
-            for i, text in enumerate(input):
-                try:
-                    logger.info(f"Generating embedding for chunk {i+1}/{len(input)}")
-                    embedding = self.embedding_service.generate_embedding(text)
-                    embeddings.append(embedding)
-                    logger.info(f"Successfully generated embedding for chunk {i+1}")
-                except Exception as e:
-                    logger.error(f"Error generating embedding for text chunk {i+1}: {str(e)}")
-                    logger.error(f"Exception type: {type(e)}")
-                    logger.error("Full exception details:", exc_info=True)
-                    raise
+            # Embed all chunks in batched API calls rather than one request per chunk
+            embeddings = self.embedding_service.generate_embeddings_batch(list(input))
             logger.info(f"Successfully generated {len(embeddings)} embeddings")
             return embeddings
         except Exception as e:
@@ -61,9 +53,11 @@ class CustomEmbeddingFunction(EmbeddingFunction):
 
 class VectorStore:
     _instance = None
+    _instance_lock = threading.Lock()
     
     # Class-level constants
     BACKUP_INTERVAL = 3600  # 1 hour in seconds
+    DEBUG_INFO_TTL = 5  # seconds a get_debug_info() result is reused
     
     # Instance variables will be initialized in __init__
 
@@ -71,6 +65,9 @@ class VectorStore:
         # Initialize instance-level backup tracking variables
         self._last_backup_time = None
         self._pending_backup = False
+
+        # (timestamp, info) from the last get_debug_info() call
+        self._debug_info_cache = None
         
         try:
             abs_path = os.path.abspath(CHROMA_DB_PATH)
@@ -115,7 +112,7 @@ class VectorStore:
 
             # Initialize embedding service first
             logger.info("Initializing embedding service...")
-            self.embedding_service = EmbeddingService()
+            self.embedding_service = EmbeddingService.get_instance()
             logger.info("Embedding service initialized successfully")
 
             # Create embedding function instance
@@ -252,7 +249,9 @@ class VectorStore:
     @classmethod
     def get_instance(cls) -> 'VectorStore':
         if cls._instance is None:
-            cls._instance = VectorStore()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = VectorStore()
         return cls._instance
             
     def add_document(self, document: Document) -> Tuple[bool, Optional[str]]:
@@ -289,6 +288,7 @@ class VectorStore:
                     
                     # Immediately update in-memory state with the new document
                     self.documents[document.id] = document
+                    self._debug_info_cache = None  # Show the new document on the next page load
                     logger.info(f"Added document {document.id} with {len(chunks)} chunks")
                     logger.info(f"Current document count: {len(self.documents)}")
 
@@ -296,10 +296,11 @@ class VectorStore:
                     chroma_count = self.collection.count()
                     logger.info(f"ChromaDB collection count: {chroma_count}")
                     
-                    # Additional verification
+                    # Additional verification (IDs only; there's no need to read the chunk text back)
                     verify_results = self.collection.get(
                         where={"document_id": document.id},
-                        limit=1
+                        limit=1,
+                        include=[]
                     )
                     if verify_results["ids"]:
                         logger.info(f"Verified document {document.id} was properly added to ChromaDB")
@@ -341,7 +342,8 @@ class VectorStore:
             
             # Log the count of documents for diagnostic purposes
             logger.info(f"Current document count: {len(self.documents)}")
-            logger.info(f"Sample document IDs: {list(self.documents.keys())[:3]}")
+            # islice takes the first few IDs without copying every key on each search
+            logger.info(f"Sample document IDs: {list(islice(self.documents, 3))}")
 
             # Query ChromaDB with privacy protections
             try:
@@ -364,8 +366,10 @@ class VectorStore:
                 
                 # Execute query within the privacy context
                 with privacy_context():
+                    # Embed through the service's query cache so repeated queries skip the API call
+                    query_embedding = self.embedding_service.generate_query_embedding(query)
                     results = self.collection.query(
-                        query_texts=[query],
+                        query_embeddings=[query_embedding],
                         n_results=k * 3,  # Request more results to account for filtering
                         include=["documents", "metadatas", "distances"]
                     )
@@ -778,7 +782,7 @@ class VectorStore:
                 
                 logger.info(f"Loaded {len(self.documents)} unique documents from ChromaDB")
                 if self.documents:
-                    logger.info(f"Document IDs: {list(self.documents.keys())[:5]}...")
+                    logger.info(f"Document IDs: {list(islice(self.documents, 5))}...")
                 
             except Exception as e:
                 logger.error(f"Error loading documents from ChromaDB: {str(e)}")
@@ -789,7 +793,23 @@ class VectorStore:
             logger.error("Full error details:", exc_info=True)
 
     def get_debug_info(self) -> Dict:
-        """Get debug information about vector store state"""
+        """
+        Get debug information about vector store state.
+
+        Collecting it scans SQLite and lists Object Storage, so a result is
+        reused for DEBUG_INFO_TTL seconds. Callers get their own copy.
+        """
+        cached = self._debug_info_cache
+        if cached and time.time() - cached[0] < self.DEBUG_INFO_TTL:
+            return dict(cached[1])
+
+        info = self._collect_debug_info()
+        if "error" not in info:
+            self._debug_info_cache = (time.time(), info)
+        return dict(info)
+
+    def _collect_debug_info(self) -> Dict:
+        """Collect debug information about vector store state"""
         try:
             # Get document count
             doc_count = len(self.documents)
@@ -798,7 +818,7 @@ class VectorStore:
             collection_count = self.collection.count()
             
             # Document IDs and formatted document info
-            doc_ids = list(self.documents.keys())[:10]  # First 10 for a better sample
+            doc_ids = list(islice(self.documents, 10))  # First 10 for a better sample
             doc_info = []
             
             # Format document info for UI display
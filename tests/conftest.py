@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Make the project root importable, as the scripts in utils/ do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these outside a deployment
+os.environ.setdefault("OPENAI_API_KEY", "sk-test0000000000000000000000")
+os.environ.setdefault("VKB_API_KEY", "test-api-key")
@@ -0,0 +1,262 @@
+"""Tests for the embedding cache and batched embedding generation"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from services import embedding_service
+from services.embedding_service import EmbeddingCache, EmbeddingService
+
+
+class FakeEmbeddings:
+    """Stands in for client.embeddings; each vector encodes its text's length"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create(self, input, model):
+        with self._lock:
+            self.calls.append(list(input))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text)), 0.5]) for i, text in enumerate(input)
+        ])
+
+
+def make_service(delay=0.0, path=None, query_cache_size=2048):
+    """Build an EmbeddingService around a fake client, without an API key or network"""
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.api_available = True
+    service._cache = EmbeddingCache(maxsize=query_cache_size, path=path)
+    service._chunk_cache = EmbeddingCache(path=None)
+    service.client = SimpleNamespace(embeddings=FakeEmbeddings(delay))
+    return service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+# EmbeddingCache
+
+def test_cache_round_trips_float32_values():
+    cache = EmbeddingCache(path=None)
+    key = cache.key("hello")
+    cache.put(key, [0.5, -1.25, 3.0])
+    assert cache.get(key) == [0.5, -1.25, 3.0]
+    assert cache.get(cache.key("missing")) is None
+
+
+def test_cache_key_depends_on_model(monkeypatch):
+    key = EmbeddingCache.key("hello")
+    monkeypatch.setattr(embedding_service, "EMBEDDING_MODEL", "another-model")
+    assert EmbeddingCache.key("hello") != key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(maxsize=2, path=None)
+    a, b, c = (cache.key(text) for text in "abc")
+    cache.put(a, [1.0])
+    cache.put(b, [2.0])
+    assert cache.get(a) == [1.0]  # a is now the most recently used
+    cache.put(c, [3.0])
+    assert cache.get(b) is None
+    assert cache.get(a) == [1.0]
+    assert cache.get(c) == [3.0]
+
+
+def test_disk_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    key = EmbeddingCache.key("persisted")
+    EmbeddingCache(path=path).put(key, [1.0, 2.0])
+
+    cache = EmbeddingCache(maxsize=1, path=path)
+    assert cache.get(key) == [1.0, 2.0]
+    # A disk hit is promoted into the memory tier
+    assert key in cache._mem
+
+
+def test_disk_tier_ignores_expired_entries(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_service.time, "time", clock)
+    path = str(tmp_path / "embeddings.db")
+    old, fresh = EmbeddingCache.key("old"), EmbeddingCache.key("fresh")
+
+    writer = EmbeddingCache(path=path, ttl=60)
+    writer.put(old, [1.0])
+    clock.now += 50
+    writer.put(fresh, [2.0])
+    clock.now += 20  # old is 70s old, fresh is 20s old
+
+    reader = EmbeddingCache(path=path, ttl=60)
+    assert reader.get(old) is None
+    assert reader.get(fresh) == [2.0]
+
+
+def test_opening_the_disk_tier_prunes_expired_rows(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_service.time, "time", clock)
+    path = str(tmp_path / "embeddings.db")
+
+    writer = EmbeddingCache(path=path, ttl=60)
+    writer.put(EmbeddingCache.key("old"), [1.0])
+    clock.now += 50
+    writer.put(EmbeddingCache.key("fresh"), [2.0])
+    clock.now += 20
+
+    reader = EmbeddingCache(path=path, ttl=60)
+    rows = reader._db.execute("SELECT key FROM emb").fetchall()
+    assert [row[0] for row in rows] == [EmbeddingCache.key("fresh")]
+
+
+def test_put_many_writes_one_transaction(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.db"))
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+    items = [(cache.key(f"chunk {i}"), [float(i)]) for i in range(50)]
+
+    cache.put_many(items, remember=False)
+
+    assert sum(statement.upper() == "COMMIT" for statement in statements) == 1
+    assert cache._db.execute("SELECT COUNT(*) FROM emb").fetchone()[0] == 50
+    # Disk only: the memory tier is left alone
+    assert not cache._mem
+    assert cache.get(items[7][0], remember=False) == [7.0]
+    assert not cache._mem
+
+
+def test_unusable_disk_path_falls_back_to_memory(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "missing-dir" / "embeddings.db"))
+    assert cache._db is None
+    key = cache.key("text")
+    cache.put(key, [1.0])
+    assert cache.get(key) == [1.0]
+
+
+# EmbeddingService.generate_embeddings_batch
+
+def test_batch_returns_embeddings_in_input_order():
+    service = make_service()
+    texts = ["a", "bbb", "", "cc", "   "]
+    embeddings = service.generate_embeddings_batch(texts)
+    assert embeddings == [[1.0, 0.5], [3.0, 0.5], None, [2.0, 0.5], None]
+    assert service.client.embeddings.calls == [["a", "bbb", "cc"]]
+
+
+def test_batch_sends_repeated_and_cached_texts_once():
+    service = make_service()
+    service._cache.put(service._cache.key("cached"), [9.0, 9.0])
+    embeddings = service.generate_embeddings_batch(["dup", "cached", "dup", "new"])
+    assert embeddings == [[3.0, 0.5], [9.0, 9.0], [3.0, 0.5], [3.0, 0.5]]
+    assert service.client.embeddings.calls == [["dup", "new"]]
+
+    # Every result was cached, so a second call makes no request
+    service.generate_embeddings_batch(["new", "dup"])
+    assert len(service.client.embeddings.calls) == 1
+
+
+def test_large_batch_does_not_evict_query_embeddings(tmp_path):
+    service = make_service(path=str(tmp_path / "embeddings.db"), query_cache_size=2)
+    query_key = service._cache.key("what is hnsw")
+    service._cache.put(query_key, [1.0])
+
+    texts = [f"chunk {i}" for i in range(20)]
+    service.generate_embeddings_batch(texts)
+
+    assert list(service._cache._mem) == [query_key]
+    # The chunks are on disk, so a fresh chunk LRU still avoids the API
+    service._chunk_cache = EmbeddingCache(path=None)
+    service.generate_embeddings_batch(texts)
+    assert len(service.client.embeddings.calls) == 1
+
+
+def test_sub_batches_stay_within_the_shared_api_slots(monkeypatch):
+    monkeypatch.setattr(embedding_service, "EMBEDDING_BATCH_SIZE", 2)
+    monkeypatch.setattr(embedding_service, "_api_slots", threading.BoundedSemaphore(3))
+    service = make_service(delay=0.05)
+    texts = [f"text number {i}" for i in range(20)]
+
+    embeddings = service.generate_embeddings_batch(texts)
+
+    assert embeddings == [[float(len(text)), 0.5] for text in texts]
+    calls = service.client.embeddings.calls
+    assert len(calls) == 10
+    assert all(len(batch) <= 2 for batch in calls)
+    assert 1 <= service.client.embeddings.max_in_flight <= 3
+
+
+def test_query_embeddings_are_cached(monkeypatch):
+    service = make_service()
+    requests = []
+
+    def fake_generate(text):
+        requests.append(text)
+        return [float(len(text))]
+
+    monkeypatch.setattr(service, "generate_embedding", fake_generate)
+    assert service.generate_query_embedding("what is hnsw") == [12.0]
+    assert service.generate_query_embedding("what is hnsw") == [12.0]
+    assert requests == ["what is hnsw"]
+
+
+# truncate_to_token_limit
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    """A one-token-per-byte tiktoken encoding, so tests don't download the model's BPE file"""
+    tiktoken = pytest.importorskip("tiktoken")
+    encoding = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r".",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    monkeypatch.setattr(embedding_service, "_get_encoding", lambda: encoding)
+    return encoding
+
+
+def test_over_limit_text_is_truncated(byte_encoding):
+    limit = embedding_service.MAX_EMBEDDING_TOKENS
+    assert embedding_service.truncate_to_token_limit("x" * (limit + 500)) == "x" * limit
+    assert embedding_service.truncate_to_token_limit("y" * limit) == "y" * limit
+
+
+def test_special_token_text_is_encoded_as_plain_text(byte_encoding):
+    text = "<|endoftext|>" + "z" * embedding_service.MAX_EMBEDDING_TOKENS
+    truncated = embedding_service.truncate_to_token_limit(text)
+    assert truncated == text[:embedding_service.MAX_EMBEDDING_TOKENS]
+
+
+def test_unloadable_encoding_leaves_text_untruncated(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+    attempts = []
+
+    def offline(model):
+        attempts.append(model)
+        raise OSError("cannot download BPE file")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", offline)
+    embedding_service._get_encoding.cache_clear()
+    try:
+        text = "x" * (embedding_service.MAX_EMBEDDING_TOKENS * 2)
+        assert embedding_service.truncate_to_token_limit(text) == text
+        assert embedding_service.truncate_to_token_limit(text) == text
+        # The failed load is remembered, not retried per input
+        assert len(attempts) == 1
+    finally:
+        embedding_service._get_encoding.cache_clear()
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import httpx
+
+from services import http_client
+
+
+def test_concurrent_first_calls_share_one_client(monkeypatch):
+    created = []
+    real_client = httpx.Client
+
+    def slow_client(*args, **kwargs):
+        # Widen the window between the None check and the assignment
+        time.sleep(0.05)
+        client = real_client(*args, **kwargs)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(http_client, "_http_client", None)
+    monkeypatch.setattr(http_client.httpx, "Client", slow_client)
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(http_client.get_http_client())
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in results)
+    created[0].close()
@@ -0,0 +1,64 @@
+"""Tests for utils.json_provider"""
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+flask = pytest.importorskip("flask")
+pytest.importorskip("orjson")
+
+from flask.json.provider import DefaultJSONProvider
+from utils.json_provider import OrjsonProvider, install_json_provider
+
+PAYLOAD = {
+    "status": "success",
+    "count": 2,
+    "score": 0.25,
+    "missing": None,
+    "results": [{"title": "b", "id": 2}, {"title": "a", "id": 1}],
+    "uploaded": datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc),
+    "day": date(2025, 3, 1),
+    "size": Decimal("1.5"),
+    "document_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+}
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    install_json_provider(app)
+    return app
+
+
+def test_install_uses_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+
+
+def test_output_matches_default_provider(app):
+    default = DefaultJSONProvider(app)
+    ours = app.json.dumps(PAYLOAD)
+    expected = default.dumps(PAYLOAD)
+    # Same values and key order; only the whitespace differs
+    assert json.loads(ours) == json.loads(expected)
+    assert list(json.loads(ours)) == list(json.loads(expected))
+    assert json.loads(ours)["uploaded"] == "Sat, 01 Mar 2025 12:30:00 GMT"
+
+
+def test_keys_are_sorted(app):
+    text = app.json.dumps({"b": {"z": 1, "y": 2}, "a": 0})
+    assert text == '{"a":0,"b":{"y":2,"z":1}}'
+
+
+def test_jsonify_and_request_parsing(app):
+    with app.test_request_context(method="POST", json={"query": "héllo", "k": 3}):
+        assert flask.request.get_json() == {"query": "héllo", "k": 3}
+        response = flask.jsonify(PAYLOAD)
+    assert response.mimetype == "application/json"
+    assert response.get_json()["results"][0] == {"id": 2, "title": "b"}
+
+
+def test_numpy_values_serialize(app):
+    np = pytest.importorskip("numpy")
+    assert app.json.dumps({"v": np.array([1.0, 2.0], dtype=np.float32)}) == '{"v":[1.0,2.0]}'
@@ -0,0 +1,147 @@
+"""Tests for services.pdf_processor"""
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from services import pdf_processor
+from services.pdf_processor import PDFProcessor
+
+
+def make_pdf(page_texts):
+    """Build an in-memory PDF with one line of text per page ("" for a blank page)"""
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+PAGES = [f"Page number {i}" for i in range(12)]
+
+
+def test_parallel_extraction_matches_serial(monkeypatch):
+    pdf = make_pdf(PAGES)
+    serial_text, error = PDFProcessor.extract_text(pdf)
+    assert error is None
+
+    monkeypatch.setattr(PDFProcessor, "PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(PDFProcessor, "PAGE_BATCH_SIZE", 5)
+    monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 2)
+    pages, error = PDFProcessor.extract_pages_parallel(pdf, len(PAGES))
+    assert error is None
+    assert pages is not None  # the pool ran rather than falling back
+    parallel_text, error = PDFProcessor.extract_text(pdf)
+    assert error is None
+    assert parallel_text == serial_text
+
+
+def test_pool_failure_falls_back_to_serial(monkeypatch):
+    pdf = make_pdf(PAGES)
+    serial_text, _ = PDFProcessor.extract_text(pdf)
+
+    class BrokenPool:
+        def __init__(self, *args, **kwargs):
+            raise OSError("process creation not permitted")
+
+    monkeypatch.setattr(PDFProcessor, "PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(pdf_processor, "ProcessPoolExecutor", BrokenPool)
+    assert PDFProcessor.extract_pages_parallel(pdf, len(PAGES)) == (None, None)
+
+    text, error = PDFProcessor.extract_text(pdf)
+    assert error is None
+    assert text == serial_text
+    for page_text in PAGES:
+        assert page_text in text
+
+
+class InlinePool:
+    """Runs the pool's initializer and tasks in this process, recording what each task receives"""
+    tasks = []
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, iterable):
+        for args in iterable:
+            InlinePool.tasks.append(args)
+            yield fn(args)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_pdf_bytes_reach_workers_once_through_the_initializer(monkeypatch):
+    pdf = make_pdf(PAGES)
+    InlinePool.tasks = []
+    monkeypatch.setattr(PDFProcessor, "PAGE_BATCH_SIZE", 5)
+    monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(pdf_processor, "ProcessPoolExecutor", InlinePool)
+
+    texts, error = PDFProcessor.extract_pages_parallel(pdf, len(PAGES))
+
+    assert error is None
+    assert InlinePool.tasks == [(0, 5), (5, 10), (10, 12)]
+    assert [text.strip() for text in texts] == PAGES
+
+
+def test_parallel_extraction_enforces_the_memory_limit(monkeypatch):
+    pdf = make_pdf(PAGES)
+    monkeypatch.setattr(PDFProcessor, "PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(PDFProcessor, "MAX_MEMORY_PER_PAGE", 0)
+    monkeypatch.setattr(PDFProcessor, "BASE_MEMORY", 0)
+    monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(pdf_processor, "ProcessPoolExecutor", InlinePool)
+
+    texts, error = PDFProcessor.extract_pages_parallel(pdf, len(PAGES))
+    assert texts is None
+    assert error.startswith("Memory limit exceeded")
+
+    text, error = PDFProcessor.extract_text(pdf)
+    assert text is None
+    assert error.startswith("Memory limit exceeded")
+
+
+def test_text_flags_only_drop_ligature_preservation():
+    assert not pdf_processor.TEXT_FLAGS & fitz.TEXT_PRESERVE_LIGATURES
+    assert pdf_processor.TEXT_FLAGS | fitz.TEXT_PRESERVE_LIGATURES == fitz.TEXTFLAGS_TEXT
+
+
+def test_plain_text_matches_default_extraction():
+    pdf = make_pdf(["Hello world", "Second page"])
+    text, error = PDFProcessor.extract_text(pdf)
+    assert error is None
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        assert text == "\n".join(page.get_text() for page in doc)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_pdf_without_text_is_reported_empty(monkeypatch, parallel):
+    if parallel:
+        monkeypatch.setattr(PDFProcessor, "PARALLEL_MIN_PAGES", 2)
+        monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 2)
+    text, error = PDFProcessor.extract_text(make_pdf(["", "", ""]))
+    assert text is None
+    assert error == "No text content found in PDF"
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_blank_pages_keep_their_place_as_empty_strings(monkeypatch, parallel):
+    if parallel:
+        monkeypatch.setattr(PDFProcessor, "PARALLEL_MIN_PAGES", 2)
+        monkeypatch.setattr(pdf_processor.os, "cpu_count", lambda: 2)
+    pdf = make_pdf(["First page", "", "Third page"])
+    text, error = PDFProcessor.extract_text(pdf)
+    assert error is None
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        first, third = doc[0].get_text(), doc[2].get_text()
+    assert text == "\n".join([first, "", third])
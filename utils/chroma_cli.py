@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
 import click
-import chromadb
-import json
 import sys
 import os
 import logging
 import argparse
+import functools
 
 # Robust path adjustment
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(os.path.join(script_dir, '..'))
 sys.path.insert(0, project_root)
 
-from config import CHROMA_DB_PATH
-from services.embedding_service import EmbeddingService
-from services.vector_store import CustomEmbeddingFunction
+# chromadb, json and config are imported inside the functions that need them
+# so that --help and argument errors return without loading them
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, 
@@ -22,8 +20,30 @@ logging.basicConfig(level=logging.INFO,
                     stream=sys.stdout)
 logger = logging.getLogger("chroma-cli")
 
+# Output formats for list_chunks rows
+CHUNK_HEADER_FMT = "\nChunk #{}: {}"
+DOC_ID_FMT = "  Document ID: {}"
+FILENAME_FMT = "  Filename: {}"
+CHUNK_POSITION_FMT = "  Chunk: {}/{}"
+CHUNK_INDEX_FMT = "  Chunk index: {}"
+METADATA_ITEM_FMT = "  {}: {}"
+
+class _NoEmbed:
+    """Placeholder embedding function for commands that never embed text.
+
+    Passing it to get_collection stops ChromaDB from loading its default
+    ONNX embedding model just to read or delete stored chunks. It satisfies
+    ChromaDB's EmbeddingFunction protocol structurally, so chromadb does not
+    have to be imported to define it.
+    """
+    def __call__(self, input):
+        raise RuntimeError("This command does not generate embeddings")
+
+@functools.lru_cache(maxsize=1)
 def get_client():
     """Create ChromaDB client with exact same config as the main app"""
+    import chromadb
+    from config import CHROMA_DB_PATH
     return chromadb.PersistentClient(
         path=CHROMA_DB_PATH,
         settings=chromadb.Settings(
@@ -32,16 +52,15 @@ def get_client():
         )
     )
 
-def get_embedding_function():
-    """Initialize embedding function exactly as the main app does"""
-    embedding_service = EmbeddingService()
-    return CustomEmbeddingFunction(embedding_service)
+@functools.lru_cache(maxsize=32)
+def _get_collection(name: str):
+    """Get a collection once per CLI invocation, without an embedding model"""
+    return get_client().get_collection(name=name, embedding_function=_NoEmbed())
 
 def list_collections():
     """List all collections, their dimensionality, and document IDs"""
     client = get_client()
     collections = client.list_collections()
-    embedding_func = get_embedding_function()
 
     expected_dimensionality = 1536
 
@@ -54,7 +73,7 @@ def list_collections():
 
     for collection_name in collections:
         try:
-            collection = client.get_collection(name=collection_name, embedding_function=embedding_func)
+            collection = _get_collection(collection_name)
             dimensionality = expected_dimensionality
             logger.info(f"\nCollection: {collection_name}")
             logger.info(f"Dimensionality: {dimensionality}")
@@ -81,9 +100,7 @@ def list_collections():
 
 def delete_documents_by_ids(collection_name, document_ids):
     """Delete specific documents from a collection by their IDs."""
-    client = get_client()
-    embedding_func = get_embedding_function()
-    collection = client.get_collection(name=collection_name, embedding_function=embedding_func)
+    collection = _get_collection(collection_name)
 
     logger.info(f"Deleting documents with IDs: {document_ids} from collection '{collection_name}'")
     collection.delete(ids=document_ids)
@@ -91,9 +108,7 @@ def delete_documents_by_ids(collection_name, document_ids):
 
 def nuke_collection(collection_name):
     """Remove all documents from a collection without changing its structure."""
-    client = get_client()
-    embedding_func = get_embedding_function()
-    collection = client.get_collection(name=collection_name, embedding_function=embedding_func)
+    collection = _get_collection(collection_name)
 
     # Fetch all document IDs
     documents = collection.get(include=["documents"])
@@ -126,7 +141,8 @@ def cli():
     pass
 
 @cli.command()
-def diagnose_db():
+@click.option('--verbose', '-v', is_flag=True, help='Also count every item in the database directory')
+def diagnose_db(verbose):
     """Run diagnostics on the ChromaDB database"""
     client = get_client()
     
@@ -167,13 +183,18 @@ def diagnose_db():
                 click.echo(f"❌ Error accessing collection: {str(e)}")
                 
         # Check database files
+        from config import CHROMA_DB_PATH
         db_path = CHROMA_DB_PATH
         if os.path.exists(db_path):
-            files = os.listdir(db_path)
-            click.echo(f"\nDatabase directory contains {len(files)} items")
-            sqlite_files = [f for f in files if f.endswith('.sqlite3')]
-            if sqlite_files:
-                click.echo(f"✅ Found SQLite database files: {', '.join(sqlite_files)}")
+            if verbose:
+                with os.scandir(db_path) as entries:
+                    item_count = sum(1 for _ in entries)
+                click.echo(f"\nDatabase directory contains {item_count} items")
+            # Stop at the first SQLite file instead of listing every HNSW segment file
+            with os.scandir(db_path) as entries:
+                sqlite_file = next((entry.name for entry in entries if entry.name.endswith('.sqlite3')), None)
+            if sqlite_file:
+                click.echo(f"✅ Found SQLite database file: {sqlite_file}")
             else:
                 click.echo("❌ No SQLite database files found")
         else:
@@ -188,9 +209,8 @@ def diagnose_db():
 @click.option('--force', '-f', is_flag=True, help='Skip confirmation prompt')
 def delete_chunk(collection_name, chunk_id, force):
     """Delete a specific chunk from a collection"""
-    client = get_client()
     try:
-        collection = client.get_collection(name=collection_name)
+        collection = _get_collection(collection_name)
 
         # Get chunk details before deletion
         results = collection.get(ids=[chunk_id])
@@ -204,6 +224,7 @@ def delete_chunk(collection_name, chunk_id, force):
         click.echo("==================")
         click.echo(f"ID: {chunk_id}")
         if results['metadatas'][0]:
+            import json
             click.echo("Metadata:")
             click.echo(json.dumps(results['metadatas'][0], indent=2))
 
@@ -231,9 +252,8 @@ def delete_chunk(collection_name, chunk_id, force):
 @click.option('--show-content/--no-content', default=False, help='Display chunk content')
 def list_chunks(collection_name, document_id, limit, show_content):
     """List chunks in a collection with filtering options"""
-    client = get_client()
     try:
-        collection = client.get_collection(name=collection_name)
+        collection = _get_collection(collection_name)
         
         # Get all chunks, with optional filtering
         if document_id:
@@ -254,36 +274,41 @@ def list_chunks(collection_name, document_id, limit, show_content):
             
         click.echo(f"Found {len(all_chunks['ids'])} chunks")
         
+        # Build each chunk's block in memory and write it with one echo call
+        _echo = click.echo
         for i, (chunk_id, metadata, document) in enumerate(zip(
             all_chunks['ids'], 
             all_chunks['metadatas'], 
             all_chunks['documents']
         )):
-            click.echo(f"\nChunk #{i+1}: {chunk_id}")
+            lines = [CHUNK_HEADER_FMT.format(i + 1, chunk_id)]
+            append = lines.append
             
-            # Display metadata
+            # Display metadata in a single pass: pop the known keys, then print the rest
             if metadata:
-                click.echo("Metadata:")
-                doc_id = metadata.get('document_id', 'Unknown')
-                filename = metadata.get('filename', 'Unknown')
-                chunk_index = metadata.get('chunk_index', 'Unknown')
-                total_chunks = metadata.get('total_chunks', 'Unknown')
+                append("Metadata:")
+                remaining = dict(metadata)
+                doc_id = remaining.pop('document_id', 'Unknown')
+                filename = remaining.pop('filename', 'Unknown')
+                chunk_index = remaining.pop('chunk_index', 'Unknown')
+                total_chunks = remaining.pop('total_chunks', 'Unknown')
                 
-                click.echo(f"  Document ID: {doc_id}")
-                click.echo(f"  Filename: {filename}")
-                click.echo(f"  Chunk: {chunk_index+1}/{total_chunks}" 
-                          if isinstance(chunk_index, int) else f"  Chunk index: {chunk_index}")
+                append(DOC_ID_FMT.format(doc_id))
+                append(FILENAME_FMT.format(filename))
+                append(CHUNK_POSITION_FMT.format(chunk_index + 1, total_chunks)
+                       if isinstance(chunk_index, int) else CHUNK_INDEX_FMT.format(chunk_index))
                 
                 # Display other metadata
-                for key, value in metadata.items():
-                    if key not in ['document_id', 'filename', 'chunk_index', 'total_chunks']:
-                        click.echo(f"  {key}: {value}")
+                for key, value in remaining.items():
+                    append(METADATA_ITEM_FMT.format(key, value))
             
             # Display content if requested
             if show_content and document:
-                click.echo("Content Preview:")
+                append("Content Preview:")
                 content_preview = document[:200] + "..." if len(document) > 200 else document
-                click.echo(f"  {content_preview}")
+                append(f"  {content_preview}")
+            
+            _echo("\n".join(lines))
                 
     except Exception as e:
         click.echo(f"Error: {str(e)}")
@@ -295,9 +320,8 @@ def list_chunks(collection_name, document_id, limit, show_content):
 @click.option('--force', '-f', is_flag=True, help='Skip confirmation prompt')
 def delete_pdf(collection_name, document_id, force):
     """Delete all chunks of a PDF document"""
-    client = get_client()
     try:
-        collection = client.get_collection(name=collection_name)
+        collection = _get_collection(collection_name)
 
         # Get all documents to search for chunks
         all_docs = collection.get()
@@ -322,6 +346,7 @@ def delete_pdf(collection_name, document_id, force):
         click.echo(f"Filename: {pdf_metadata.get('filename', 'Unknown')}")
         click.echo(f"Total chunks: {len(chunk_ids)}")
         if pdf_metadata:
+            import json
             click.echo("Metadata:")
             click.echo(json.dumps(pdf_metadata, indent=2))
 
@@ -347,9 +372,8 @@ def delete_pdf(collection_name, document_id, force):
 @click.argument('collection_name')
 def nuke_db(collection_name):
     """⚠️ DANGER: Delete ALL documents and chunks from the database."""
-    client = get_client()
     try:
-        collection = client.get_collection(name=collection_name)
+        collection = _get_collection(collection_name)
 
         # Get all documents before deletion
         all_docs = collection.get()
@@ -1,12 +1,21 @@
 #!/usr/bin/env python3
 """
 Simple script to delete a single file from the history folder as a sanity check.
+
+Usage:
+    python utils/delete_one_history_file.py [--all]
+
+Options:
+    --all    Delete every history file, with deletions issued in parallel
 """
 
 import os
 import sys
 import logging
-from typing import Optional, List
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, Optional, List, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -22,8 +31,46 @@ except ImportError:
     logger.warning("Replit Object Storage not available")
     HAS_OBJECT_STORAGE = False
 
-def list_history_files(limit=5) -> List[str]:
-    """List a few history files"""
+try:
+    from replit.object_storage.errors import ObjectNotFoundError
+except ImportError:
+    class ObjectNotFoundError(Exception):
+        """Placeholder when the Object Storage errors module is unavailable"""
+
+# Number of deletions kept in flight at once when deleting all history files
+MAX_DELETE_WORKERS = 32
+
+# Shared Object Storage client, created on first use and reused across threads
+_CLIENT = None
+
+def _get_client():
+    """Get the shared Object Storage client"""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = object_storage.Client()
+    return _CLIENT
+
+def iter_history_files(client, limit: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield history file names as the listing is consumed.
+    
+    The listing is read lazily, so a small limit only pulls the first page
+    instead of materializing every history object. Keys the listing repeats
+    (e.g. overlapping pages) are yielded only once.
+    """
+    # List objects with 'chromadb/history/' prefix
+    prefix = "chromadb/history/"
+    seen = set()
+    keys = (
+        # Store names as strings, converting the object if all else fails
+        getattr(obj, 'key', None) or getattr(obj, 'name', None) or str(obj)
+        for obj in client.list(prefix=prefix)
+    )
+    unique_keys = (key for key in keys if not (key in seen or seen.add(key)))
+    yield from islice(unique_keys, limit)
+
+def list_history_files(limit: Optional[int] = 5) -> List[str]:
+    """List history files, or all of them when limit is None"""
     if not HAS_OBJECT_STORAGE:
         print("Object Storage is not available")
         return []
@@ -36,46 +83,37 @@ def list_history_files(limit=5) -> List[str]:
             return []
             
         # Create client
-        client = object_storage.Client()
+        client = _get_client()
         bucket_name = f"replit-objstore-{repl_id}"
         print(f"Checking bucket: {bucket_name}")
         
-        # List objects with 'chromadb/history/' prefix
-        prefix = "chromadb/history/"
-        objects = list(client.list(prefix=prefix))
-        
-        # Return first few objects, store their names as strings
-        files = []
-        for obj in objects[:limit]:
-            if hasattr(obj, 'key'):
-                files.append(obj.key)
-            elif hasattr(obj, 'name'):
-                files.append(obj.name)
-            else:
-                # Just convert the object to string if all else fails
-                files.append(str(obj))
-                
-        return files
+        return list(iter_history_files(client, limit=limit))
         
     except Exception as e:
         print(f"ERROR: {e}")
         return []
 
-def delete_file(file_path: str) -> bool:
-    """Delete a single file from object storage"""
+def delete_file(file_path: str, client=None) -> bool:
+    """
+    Delete a single file from object storage.
+    
+    Args:
+        file_path: Key of the file to delete
+        client: Object Storage client to use; when given, the environment checks are skipped
+    """
     if not HAS_OBJECT_STORAGE:
         print("Object Storage is not available")
         return False
         
     try:
-        # Get environment variables for storage
-        repl_id = os.environ.get("REPL_ID")
-        if not repl_id:
-            print("ERROR: REPL_ID environment variable not found")
-            return False
-            
-        # Create client
-        client = object_storage.Client()
+        if client is None:
+            # Get environment variables for storage
+            repl_id = os.environ.get("REPL_ID")
+            if not repl_id:
+                print("ERROR: REPL_ID environment variable not found")
+                return False
+                
+            client = _get_client()
         
         # Delete the file
         print(f"Deleting file: {file_path}")
@@ -83,11 +121,59 @@ def delete_file(file_path: str) -> bool:
         print(f"Successfully deleted: {file_path}")
         return True
         
+    except ObjectNotFoundError:
+        # Already gone (e.g. removed by a concurrent cleanup), which is the outcome we wanted
+        print(f"Already deleted: {file_path}")
+        return True
     except Exception as e:
         print(f"ERROR: {e}")
         return False
 
+def delete_files(file_paths: List[str], max_workers: int = MAX_DELETE_WORKERS) -> Tuple[int, int]:
+    """
+    Delete many files from object storage, overlapping the network round-trips.
+    
+    Returns:
+        Tuple[int, int]: (deleted_count, failed_count)
+    """
+    if not file_paths:
+        return 0, 0
+        
+    # Don't spend a round-trip on a key that is already queued
+    file_paths = list(dict.fromkeys(file_paths))
+    client = _get_client()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda key: delete_file(key, client=client), file_paths, chunksize=8))
+    
+    deleted = sum(results)
+    return deleted, len(results) - deleted
+
+def delete_all_history_files() -> int:
+    """Delete every history file in parallel"""
+    print("\n=== Delete All History Files ===\n")
+    
+    print("Listing history files...")
+    files = list_history_files(limit=None)
+    
+    if not files:
+        print("No history files found")
+        return 1
+        
+    print(f"\nDeleting {len(files)} history files using {MAX_DELETE_WORKERS} workers...")
+    deleted, failed = delete_files(files)
+    
+    print(f"\nDeleted {deleted} of {len(files)} history files ({failed} failed)")
+    return 0 if failed == 0 else 1
+
 def main():
+    parser = argparse.ArgumentParser(description="Delete history files from Replit Object Storage")
+    parser.add_argument('--all', action='store_true',
+                        help='Delete every history file instead of a single sanity-check file')
+    args = parser.parse_args()
+    
+    if args.all:
+        return delete_all_history_files()
+    
     print("\n=== Delete Single History File (Sanity Check) ===\n")
     
     # List a few history files
@@ -0,0 +1,43 @@
+"""
+orjson-backed JSON provider for Flask.
+
+Installed on the app in create_app() so jsonify() and request.get_json()
+use orjson's C encoder/decoder instead of the stdlib json module. Output
+matches Flask's default provider: keys are sorted, and dates, decimals and
+other types orjson doesn't handle natively go through Flask's default().
+"""
+
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# orjson is installed alongside chromadb; without it Flask's default provider is used
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Let Flask's default() format datetimes (HTTP date strings, as before)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def install_json_provider(app) -> None:
+    """Use orjson for the app's JSON if it is available"""
+    if HAS_ORJSON:
+        app.json = OrjsonProvider(app)
+        logger.info("Using orjson for JSON responses")
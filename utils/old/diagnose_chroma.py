@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import chromadb
+import gc
 import os
 import sys
 import json
@@ -7,6 +8,9 @@ import json
 # Use the same directory as the application
 CHROMA_PERSIST_DIR = "chroma_db"
 
+# Number of records fetched per collection.get() call when enumerating chunks
+PAGE_SIZE = 10000
+
 print(f"===== ChromaDB Diagnostic Tool =====")
 print(f"ChromaDB version: {chromadb.__version__}")
 print(f"Database directory: {os.path.abspath(CHROMA_PERSIST_DIR)}")
@@ -48,26 +52,30 @@ try:
         print(f"\nCollection '{collection_name}' contains {count} documents")
 
         if count > 0:
-            # Get sample data
-            sample = collection.get(limit=1)
+            # Get sample data (metadata only, no documents or embeddings)
+            sample = collection.get(limit=1, include=["metadatas"])
             print(f"Sample ID: {sample['ids'][0] if sample['ids'] else 'None'}")
 
-            # Check for document IDs
-            doc_ids = set()
-            if sample['metadatas']:
-                for metadata in sample['metadatas']:
-                    if metadata and 'document_id' in metadata:
-                        doc_ids.add(metadata['document_id'])
-
-            print(f"Unique document IDs in sample: {len(doc_ids)}")
-            if doc_ids:
-                print(f"Sample document ID: {list(doc_ids)[0]}")
+            # Unique document IDs are counted in SQL below; here we only need one sample ID
+            sample_metadata = sample['metadatas'][0] if sample['metadatas'] else None
+            sample_id = sample_metadata.get('document_id') if sample_metadata else None
+            if sample_id:
+                print(f"Sample document ID: {sample_id}")
 
-                # Try to get all chunks for a specific document
+                # Count all chunks for a specific document page by page, so memory stays bounded
                 try:
-                    sample_id = list(doc_ids)[0]
-                    doc_chunks = collection.get(where={"document_id": sample_id})
-                    print(f"Document '{sample_id}' has {len(doc_chunks['ids'])} chunks")
+                    chunk_count = 0
+                    for offset in range(0, count, PAGE_SIZE):
+                        page = collection.get(
+                            where={"document_id": sample_id},
+                            limit=PAGE_SIZE,
+                            offset=offset,
+                            include=[]
+                        )
+                        chunk_count += len(page['ids'])
+                        if len(page['ids']) < PAGE_SIZE:
+                            break
+                    print(f"Document '{sample_id}' has {chunk_count} chunks")
                 except Exception as e:
                     print(f"Error querying document chunks: {str(e)}")
         else:
@@ -77,18 +85,38 @@ try:
 
 except Exception as e:
     print(f"Error accessing ChromaDB: {str(e)}")
+finally:
+    # Release the client (SQLite handle and loaded HNSW indices) before the raw SQLite analysis
+    client = collection = None
+    gc.collect()
 
 print("\n===== Database Structure Analysis =====")
 # Try to analyze the database structure directly
 try:
     import sqlite3
-    conn = sqlite3.connect(os.path.join(CHROMA_PERSIST_DIR, "chroma.sqlite3"))
+    # Open read-only so the diagnostic doesn't take write locks or create a journal
+    sqlite_path = os.path.abspath(os.path.join(CHROMA_PERSIST_DIR, "chroma.sqlite3"))
+    conn = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA query_only=1;")
+    # Memory-map up to 256MB of the database instead of a pread() per page
+    cursor.execute("PRAGMA mmap_size=268435456;")
 
     # Get all tables
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     tables = cursor.fetchall()
-    print(f"SQLite tables: {[t[0] for t in tables]}")
+    table_names = [t[0] for t in tables]
+    print(f"SQLite tables: {table_names}")
+
+    # Let SQLite group the document IDs instead of building a set in Python
+    if 'embedding_metadata' in table_names:
+        cursor.execute("SELECT string_value, COUNT(*) FROM embedding_metadata WHERE key='document_id' GROUP BY string_value;")
+        doc_id_rows = cursor.fetchall()
+        print(f"Unique document IDs: {len(doc_id_rows)}")
+        for doc_id, chunk_count in doc_id_rows[:3]:
+            print(f"Document ID sample: {doc_id} ({chunk_count} chunks)")
+    else:
+        print("No 'embedding_metadata' table found")
 
     # Check key tables
     try:
@@ -1,11 +1,43 @@
 """
 Privacy-focused log handler for filtering sensitive information from logs
 """
+import json
 import logging
 import re
 from typing import Dict, List, Pattern, Optional, Union
 
 
+# Replacement text for each named pattern, applied in the patterns' dict order
+REDACTIONS = {
+    'email': '[EMAIL REDACTED]',
+    'api_key': r'\1: [API KEY REDACTED]',
+    'openai_key': r'\1[API KEY REDACTED]\3',
+    'api_key_assign': r'\1[API KEY REDACTED]\3',
+    'bearer_token': r'Bearer [TOKEN REDACTED]',
+    'query_content': r'\1[QUERY CONTENT REDACTED]\3',
+    'json_query': r'\1[QUERY CONTENT REDACTED]\3',
+    'form_query': r'\1[QUERY CONTENT REDACTED]\3',
+    'url_query': r'\1query=[QUERY CONTENT REDACTED]\3',
+    'dict_query': r'\1[QUERY CONTENT REDACTED]\3',
+    'f_string_query': r'\1[QUERY CONTENT REDACTED]\3',
+    'log_query': r'\1[QUERY CONTENT REDACTED]\3',
+    'pdf_content': '[PDF CONTENT REDACTED]',
+    'openai_request_input': r'\1[QUERY CONTENT REDACTED]\3',
+    'openai_json_data': r'\1[QUERY CONTENT REDACTED]\3',
+    'sk_api_keys': r'[API KEY REDACTED]',
+    'openai_p_keys': r'[API KEY REDACTED]',
+    'env_var_api_key': r'\1=[API KEY REDACTED]',
+    'x_api_key': r'\1: [API KEY REDACTED]',
+    'key_header_pattern': r'\1: [API KEY REDACTED]',
+}
+
+
+def _inline_flags(pattern: Pattern) -> str:
+    """Return the inline flag letters (e.g. 'is') equivalent to a compiled pattern's flags"""
+    return ''.join(letter for flag, letter in ((re.I, 'i'), (re.M, 'm'), (re.S, 's'), (re.X, 'x'))
+                   if pattern.flags & flag)
+
+
 class PrivacyLogFilter(logging.Filter):
     """Filter that removes sensitive information from log records"""
     
@@ -55,31 +87,60 @@ class PrivacyLogFilter(logging.Filter):
             # Query in log message
             'log_query': re.compile(r'(query:\s*)([^\n\r]+)($|\n|\r)', re.IGNORECASE),
             
+            # PDF file content indicators
+            'pdf_content': re.compile(r'(%PDF-\d+\.\d+.{10,100})'),
+            
             # OpenAI API request inputs pattern
             'openai_request_input': re.compile(r'([\'"]input[\'"]:\s*\[[\'"])([^\'"]+)([\'"])', re.IGNORECASE),
             
             # OpenAI API request json_data format
             'openai_json_data': re.compile(r'(json_data[\'"]?:.*?[\'"]input[\'"]:\s*\[[\'"])([^\'"]+)([\'"])', re.IGNORECASE | re.DOTALL),
             
-            # PDF file content indicators
-            'pdf_content': re.compile(r'(%PDF-\d+\.\d+.{10,100})'),
-            
             # sk- style API keys (like OpenAI)
             'sk_api_keys': re.compile(r'(sk-[a-zA-Z0-9]{20,})'),
             
             # Newer p-* style OpenAI API keys 
             'openai_p_keys': re.compile(r'(sk-p-[a-zA-Z0-9-]{20,})'),
             
-            # Key header API keys pattern
-            'key_header_pattern': re.compile(r'(API key|key|token):\s*([a-zA-Z0-9_\-\.]{20,})', re.I),
-            
             # Environment variable assignments in logs
             'env_var_api_key': re.compile(r'(\w+_API_KEY)=([^\s]+)'),
             
             # Header-based API keys
-            'x_api_key': re.compile(r'(X-API-Key|x-api-key):\s*([a-zA-Z0-9_\-\.]{20,})')
+            'x_api_key': re.compile(r'(X-API-Key|x-api-key):\s*([a-zA-Z0-9_\-\.]{20,})'),
+            
+            # Key header API keys pattern
+            'key_header_pattern': re.compile(r'(API key|key|token):\s*([a-zA-Z0-9_\-\.]{20,})', re.I)
         }
         
+        # All patterns joined into one alternation, each keeping its own flags,
+        # so a record can be checked for sensitive content in a single scan
+        self._combined = re.compile('|'.join(
+            f"(?{_inline_flags(pattern)}:{pattern.pattern})" for pattern in self.patterns.values()
+        ))
+        
+    def _redact(self, message: str) -> str:
+        """
+        Redact sensitive information from a single string.
+        
+        Args:
+            message: The text to sanitize
+            
+        Returns:
+            str: The sanitized text
+        """
+        # One pass over the text finds out whether any pattern matches at all;
+        # most log lines match none and can be returned untouched
+        if not self._combined.search(message):
+            return message
+        
+        # Apply each pattern in turn so later patterns also see the output of
+        # earlier ones (e.g. an sk- key inside a preserved prefix still gets redacted)
+        for pattern_name, pattern in self.patterns.items():
+            replacement = REDACTIONS.get(pattern_name)
+            if replacement is not None:
+                message = pattern.sub(replacement, message)
+        return message
+        
     def filter(self, record: logging.LogRecord) -> bool:
         """
         Filter log records to remove sensitive information.
@@ -94,174 +155,27 @@ class PrivacyLogFilter(logging.Filter):
             # Skip processing if record doesn't have a string message
             if not hasattr(record, 'msg'):
                 return True
+            
+            # The same record can pass through several privacy filters (a logger's
+            # filter, then the console and file handlers' filters); redact it once
+            if getattr(record, '_privacy_filtered', False):
+                return True
                 
+            # Handle string formatting with args: merge them into the message first.
+            # Filters only run for records that pass the level check, so %-style
+            # arguments are still only stringified when the record is emitted, and
+            # the patterns see the final text (a "query: %s" template can't have
+            # its placeholder redacted away, and non-string args such as dicts
+            # are covered too)
+            if hasattr(record, 'args') and record.args:
+                record.msg = self._redact(record.getMessage())
+                record.args = None
+            
             # Handle the case where msg is already a string
-            if isinstance(record.msg, str):
-                message = record.msg
-                
-                # Replace email addresses
-                message = self.patterns['email'].sub('[EMAIL REDACTED]', message)
-                
-                # Replace API keys
-                message = self.patterns['api_key'].sub(r'\1: [API KEY REDACTED]', message)
-                
-                # Replace OpenAI specific API keys
-                message = self.patterns['openai_key'].sub(r'\1[API KEY REDACTED]\3', message)
-                
-                # Replace generic API key assignments
-                message = self.patterns['api_key_assign'].sub(r'\1[API KEY REDACTED]\3', message)
-                
-                # Replace Bearer tokens
-                message = self.patterns['bearer_token'].sub(r'Bearer [TOKEN REDACTED]', message)
-                
-                # Redact query content but preserve structure
-                message = self.patterns['query_content'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact JSON query content
-                message = self.patterns['json_query'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact form parameter query content
-                message = self.patterns['form_query'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact URL parameter query content
-                message = self.patterns['url_query'].sub(r'\1query=[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact dictionary key-value query content
-                message = self.patterns['dict_query'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact f-string query content
-                message = self.patterns['f_string_query'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact query in log messages
-                message = self.patterns['log_query'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact PDF content
-                message = self.patterns['pdf_content'].sub('[PDF CONTENT REDACTED]', message)
-                
-                # Redact OpenAI API request inputs
-                message = self.patterns['openai_request_input'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact OpenAI API json_data format
-                message = self.patterns['openai_json_data'].sub(r'\1[QUERY CONTENT REDACTED]\3', message)
-                
-                # Redact sk- style API keys (like OpenAI)
-                message = self.patterns['sk_api_keys'].sub(r'[API KEY REDACTED]', message)
-                
-                # Redact newer p-* style OpenAI API keys
-                message = self.patterns['openai_p_keys'].sub(r'[API KEY REDACTED]', message)
-                
-                # Redact environment variable assignments
-                message = self.patterns['env_var_api_key'].sub(r'\1=[API KEY REDACTED]', message)
-                
-                # Redact X-API-Key headers
-                message = self.patterns['x_api_key'].sub(r'\1: [API KEY REDACTED]', message)
-                
-                # Redact header-style API keys
-                message = self.patterns['key_header_pattern'].sub(r'\1: [API KEY REDACTED]', message)
-                
-                # Update the record
-                record.msg = message
+            elif isinstance(record.msg, str):
+                record.msg = self._redact(record.msg)
             
-            # Handle string formatting with args
-            if hasattr(record, 'args') and record.args:
-                if isinstance(record.args, dict):
-                    # Handle dict args (for named string formatting)
-                    sanitized_args = {}
-                    for key, value in record.args.items():
-                        if isinstance(value, str):
-                            sanitized_value = value
-                            for pattern_name, pattern in self.patterns.items():
-                                if pattern_name == 'email':
-                                    sanitized_value = pattern.sub('[EMAIL REDACTED]', sanitized_value)
-                                elif pattern_name == 'api_key':
-                                    sanitized_value = pattern.sub(r'\1: [API KEY REDACTED]', sanitized_value)
-                                elif pattern_name == 'openai_key':
-                                    sanitized_value = pattern.sub(r'\1[API KEY REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'api_key_assign':
-                                    sanitized_value = pattern.sub(r'\1[API KEY REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'bearer_token':
-                                    sanitized_value = pattern.sub(r'Bearer [TOKEN REDACTED]', sanitized_value)
-                                elif pattern_name == 'query_content':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'json_query':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'form_query':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'url_query':
-                                    sanitized_value = pattern.sub(r'\1query=[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'dict_query':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'f_string_query':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'log_query':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'pdf_content':
-                                    sanitized_value = pattern.sub('[PDF CONTENT REDACTED]', sanitized_value)
-                                elif pattern_name == 'openai_request_input':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'openai_json_data':
-                                    sanitized_value = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_value)
-                                elif pattern_name == 'sk_api_keys':
-                                    sanitized_value = pattern.sub(r'[API KEY REDACTED]', sanitized_value)
-                                elif pattern_name == 'openai_p_keys':
-                                    sanitized_value = pattern.sub(r'[API KEY REDACTED]', sanitized_value)
-                                elif pattern_name == 'env_var_api_key':
-                                    sanitized_value = pattern.sub(r'\1=[API KEY REDACTED]', sanitized_value)
-                                elif pattern_name == 'x_api_key':
-                                    sanitized_value = pattern.sub(r'\1: [API KEY REDACTED]', sanitized_value)
-                            sanitized_args[key] = sanitized_value
-                        else:
-                            sanitized_args[key] = value
-                    record.args = sanitized_args
-                elif isinstance(record.args, tuple):
-                    # Handle tuple args (for positional string formatting)
-                    sanitized_args = []
-                    for arg in record.args:
-                        if isinstance(arg, str):
-                            sanitized_arg = arg
-                            for pattern_name, pattern in self.patterns.items():
-                                if pattern_name == 'email':
-                                    sanitized_arg = pattern.sub('[EMAIL REDACTED]', sanitized_arg)
-                                elif pattern_name == 'api_key':
-                                    sanitized_arg = pattern.sub(r'\1: [API KEY REDACTED]', sanitized_arg)
-                                elif pattern_name == 'openai_key':
-                                    sanitized_arg = pattern.sub(r'\1[API KEY REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'api_key_assign':
-                                    sanitized_arg = pattern.sub(r'\1[API KEY REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'bearer_token':
-                                    sanitized_arg = pattern.sub(r'Bearer [TOKEN REDACTED]', sanitized_arg)
-                                elif pattern_name == 'query_content':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'json_query':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'form_query':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'url_query':
-                                    sanitized_arg = pattern.sub(r'\1query=[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'dict_query':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'f_string_query':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'log_query':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'pdf_content':
-                                    sanitized_arg = pattern.sub('[PDF CONTENT REDACTED]', sanitized_arg)
-                                elif pattern_name == 'openai_request_input':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'openai_json_data':
-                                    sanitized_arg = pattern.sub(r'\1[QUERY CONTENT REDACTED]\3', sanitized_arg)
-                                elif pattern_name == 'sk_api_keys':
-                                    sanitized_arg = pattern.sub(r'[API KEY REDACTED]', sanitized_arg)
-                                elif pattern_name == 'openai_p_keys':
-                                    sanitized_arg = pattern.sub(r'[API KEY REDACTED]', sanitized_arg)
-                                elif pattern_name == 'env_var_api_key':
-                                    sanitized_arg = pattern.sub(r'\1=[API KEY REDACTED]', sanitized_arg)
-                                elif pattern_name == 'x_api_key':
-                                    sanitized_arg = pattern.sub(r'\1: [API KEY REDACTED]', sanitized_arg)
-                            sanitized_args.append(sanitized_arg)
-                        else:
-                            sanitized_args.append(arg)
-                    record.args = tuple(sanitized_args)
+            record._privacy_filtered = True
         except Exception:
             # If any error occurs during filtering, allow the log message through unchanged
             # This ensures we don't block critical logging due to filter issues
@@ -270,6 +184,35 @@ class PrivacyLogFilter(logging.Filter):
         return True
 
 
+class RedactedJSON:
+    """
+    Wrapper for logging structured data as a lazy %-style argument.
+    
+    The JSON serialization and redaction only happen when the logging
+    framework calls str() on it, i.e. when the record is actually emitted:
+    
+        logger.info("Processing request: %s", RedactedJSON(payload))
+    """
+    __slots__ = ('obj',)
+    
+    def __init__(self, obj):
+        self.obj = obj
+        
+    def __str__(self) -> str:
+        return _get_default_filter()._redact(json.dumps(self.obj, default=str))
+
+
+# Shared filter used by RedactedJSON, created on first use
+_default_filter = None
+
+def _get_default_filter() -> 'PrivacyLogFilter':
+    """Get the shared PrivacyLogFilter instance"""
+    global _default_filter
+    if _default_filter is None:
+        _default_filter = PrivacyLogFilter()
+    return _default_filter
+
+
 def add_privacy_filter_to_logger(logger: Optional[Union[str, logging.Logger]] = None) -> logging.Logger:
     """
     Add a privacy filter to a logger to sanitize sensitive information.
@@ -38,6 +38,16 @@ except ImportError:
     logger.warning("Replit Object Storage not available")
     HAS_OBJECT_STORAGE = False
 
+# Shared Object Storage client, created on first use and reused by list and delete
+_CLIENT = None
+
+def _get_client():
+    """Get the shared Object Storage client"""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = object_storage.Client()
+    return _CLIENT
+
 def format_size(size_bytes):
     """Format size in bytes to human-readable format"""
     if size_bytes == 0:
@@ -63,7 +73,7 @@ def list_history_files() -> List[str]:
         return []
         
     try:
-        client = object_storage.Client()
+        client = _get_client()
         
         # List objects with 'chromadb/history/' prefix
         prefix = "chromadb/history/"
@@ -118,7 +128,7 @@ def delete_history_files(history_files: List[str], force: bool = False, dry_run:
         return 0, 0
     
     try:
-        client = object_storage.Client()
+        client = _get_client()
         
         # Count bytes saved for reporting
         bytes_saved = 0
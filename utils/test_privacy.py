@@ -37,6 +37,10 @@ TEST_QUERIES = [
     "My credit card number is 4111 1111 1111 1111"
 ]
 
+# The server buffers app.log writes and flushes them every LOG_FLUSH_INTERVAL
+# (1s, see main.py); wait longer than that before reading the log
+LOG_FLUSH_WAIT = 2.0
+
 # Error-inducing query designed to potentially leak content in errors
 ERROR_QUERY = "A" * 10000  # Very long query that might trigger an error
 
@@ -51,22 +55,36 @@ def get_api_key():
     return api_key
 
 
-def check_logs_for_leakage(query, log_file="app.log"):
+# Server log file checked for leaks (the server writes to VKB_LOG_PATH when set)
+LOG_FILE = os.environ.get("VKB_LOG_PATH", "app.log")
+
+
+def get_log_offset(log_file=LOG_FILE):
+    """Current size of the log file, so a later check only reads newer lines"""
+    try:
+        return os.path.getsize(log_file)
+    except OSError:
+        return 0
+
+
+def check_logs_for_leakage(query, log_file=LOG_FILE, offset=0):
     """
-    Check logs for any signs of query content leakage
+    Check logs written since offset for any signs of query content leakage
     Returns True if privacy control working (no leakage), False otherwise
     """
     try:
-        leaked = False
-        # Check last 50 lines of log file for the query
         with open(log_file, "r") as f:
-            # Read last 50 lines
-            lines = f.readlines()[-50:]
-            for line in lines:
-                if query in line and "[QUERY CONTENT REDACTED]" not in line:
-                    leaked = True
-                    logger.error(f"Privacy leak detected in logs: {line.strip()}")
-                    return False
+            f.seek(offset)
+            lines = f.readlines()
+        # No new lines means the request's records haven't been flushed yet, so
+        # there is nothing to check; don't report that as a pass
+        if not lines:
+            logger.error("No new log lines were written for this request; cannot verify privacy")
+            return False
+        for line in lines:
+            if query in line and "[QUERY CONTENT REDACTED]" not in line:
+                logger.error(f"Privacy leak detected in logs: {line.strip()}")
+                return False
         return True
     except Exception as e:
         logger.error(f"Error checking logs: {str(e)}")
@@ -84,17 +102,18 @@ def make_test_request(query, api_key):
     
     try:
         logger.info(f"Making request with privacy-sensitive content (length: {len(query)})")
+        log_offset = get_log_offset()
         response = requests.post(url, headers=headers, json=data, timeout=10)
         
         # Get status and basic info without logging content
         status_code = response.status_code
         logger.info(f"Response status code: {status_code}")
         
-        # Wait a moment for logs to be written
-        time.sleep(0.5)
+        # Wait for the server's buffered log records to be flushed to the file
+        time.sleep(LOG_FLUSH_WAIT)
         
         # Check logs for leakage
-        privacy_check = check_logs_for_leakage(query)
+        privacy_check = check_logs_for_leakage(query, offset=log_offset)
         if privacy_check:
             logger.info("✅ Privacy check passed: No query content leaked in logs")
         else:
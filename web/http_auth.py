@@ -4,51 +4,57 @@ This provides a more reliable alternative to Replit Auth when needed.
 """
 
 import os
-from functools import wraps
+from functools import cache, wraps
 from flask import request, Response, session
+from config import BASIC_AUTH_USERNAME, BASIC_AUTH_PASSWORD, IS_DEPLOYMENT
 
-def get_auth_credentials():
+@cache
+def _log_auth_environment():
     """
-    Get authentication credentials from environment variables
+    Log which authentication settings are present, once per process.
     
-    This function retrieves the authentication credentials from Replit Secrets.
+    The environment doesn't change while the app runs, so there is no need to
+    scan and sort it on every authenticated request.
     """
     import logging
     logger = logging.getLogger(__name__)
     
-    # Detect if we're in a deployment
-    is_deployment = bool(os.environ.get("REPL_DEPLOYMENT", False))
-    
     # Enhanced logging for environment variable debugging
     env_keys = sorted(os.environ.keys())
     replit_keys = [k for k in env_keys if k.startswith('REPL_')]
     auth_keys = [k for k in env_keys if 'AUTH' in k]
-    logger.info(f"Deployment mode: {is_deployment}")
+    logger.info(f"Deployment mode: {IS_DEPLOYMENT}")
     logger.info(f"Number of environment variables: {len(env_keys)}")
     logger.info(f"Replit-specific keys: {replit_keys}")
     logger.info(f"Auth-related keys found (names only, not values): {auth_keys}")
     
-    username = os.environ.get("BASIC_AUTH_USERNAME")
-    if username:
+    if BASIC_AUTH_USERNAME:
         logger.info("Found username in BASIC_AUTH_USERNAME variable")
     
-    password = os.environ.get("BASIC_AUTH_PASSWORD")
-    if password:
+    if BASIC_AUTH_PASSWORD:
         logger.info("Found password in BASIC_AUTH_PASSWORD variable")
     
     # More detailed diagnostic info 
-    logger.info(f"BASIC_AUTH_USERNAME exists: {os.environ.get('BASIC_AUTH_USERNAME') is not None}")
-    logger.info(f"BASIC_AUTH_PASSWORD exists: {os.environ.get('BASIC_AUTH_PASSWORD') is not None}")
+    logger.info(f"BASIC_AUTH_USERNAME exists: {BASIC_AUTH_USERNAME is not None}")
+    logger.info(f"BASIC_AUTH_PASSWORD exists: {BASIC_AUTH_PASSWORD is not None}")
     
     # Check if we're missing credentials
-    if not username or not password:
+    if not BASIC_AUTH_USERNAME or not BASIC_AUTH_PASSWORD:
         logger.error("Authentication credentials not found in environment variables")
         logger.error("Please ensure BASIC_AUTH_USERNAME and BASIC_AUTH_PASSWORD are set in Replit Secrets")
-        if is_deployment:
+        if IS_DEPLOYMENT:
             logger.error("CRITICAL: Authentication credentials missing in production environment")
-            # We'll return None values which will make auth checks fail
-        
-    return username, password
+
+def get_auth_credentials():
+    """
+    Get authentication credentials from environment variables
+    
+    This function returns the authentication credentials from Replit Secrets,
+    which config.py reads once at startup. Missing values are returned as None,
+    which makes auth checks fail.
+    """
+    _log_auth_environment()
+    return BASIC_AUTH_USERNAME, BASIC_AUTH_PASSWORD
 
 def check_auth(username, password):
     """Check if the username and password match the expected credentials"""
@@ -153,8 +159,8 @@ def http_auth_required(f):
                 logger.warning(f"Failed to decode auth header: {str(e)}")
         
         # Log environment variables presence (without revealing values)
-        has_username_env = bool(os.environ.get("BASIC_AUTH_USERNAME"))
-        has_password_env = bool(os.environ.get("BASIC_AUTH_PASSWORD"))
+        has_username_env = bool(BASIC_AUTH_USERNAME)
+        has_password_env = bool(BASIC_AUTH_PASSWORD)
         logger.info(f"Environment variables - Username present: {has_username_env}, Password present: {has_password_env}")
         
         # Enhanced diagnostics for env vars
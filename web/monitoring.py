@@ -3,12 +3,14 @@ import os
 import traceback
 import sqlite3
 import json
+import time
 import datetime
 from flask import Blueprint, jsonify, render_template, request
 import openai
 from services.embedding_service import EmbeddingService
+from services.http_client import get_http_client
 from services.vector_store import VectorStore
-from config import CHROMA_DB_PATH
+from config import CHROMA_DB_PATH, IS_DEPLOYMENT, OPENAI_API_KEY
 from utils.object_storage import get_chroma_storage
 from web.auth import auth_required, is_authenticated, get_user_info
 
@@ -16,12 +18,24 @@ logger = logging.getLogger(__name__)
 
 bp = Blueprint('monitoring', __name__, url_prefix='/monitoring')
 
+# Seconds a successful OpenAI health probe is reused, so frequent health
+# checks don't each make an API call
+HEALTH_CHECK_TTL = 60
+
+# (timestamp, response body) of the last successful probe
+_health_check_cache = None
+
 @bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint that tests the OpenAI API connection."""
+    global _health_check_cache
+    cached = _health_check_cache
+    if cached and time.time() - cached[0] < HEALTH_CHECK_TTL:
+        return jsonify(cached[1]), 200
+
     try:
         # Check if OpenAI API key is set
-        api_key = os.environ.get("OPENAI_API_KEY")
+        api_key = OPENAI_API_KEY
         if not api_key:
             return jsonify({
                 "status": "warning",
@@ -29,15 +43,17 @@ def health_check():
             }), 200
 
         # Test API key validity by accessing a simple endpoint
-        client = openai.OpenAI(api_key=api_key)
+        client = openai.OpenAI(api_key=api_key, http_client=get_http_client())
         models = client.models.list(limit=1)
 
-        # If we get here, the connection is working
-        return jsonify({
+        # If we get here, the connection is working; failures aren't cached
+        body = {
             "status": "ok",
             "message": "Successfully connected to OpenAI API",
             "models_accessible": True
-        }), 200
+        }
+        _health_check_cache = (time.time(), body)
+        return jsonify(body), 200
 
     except Exception as e:
         logger.error(f"OpenAI API connection test failed: {str(e)}")
@@ -54,7 +70,7 @@ def test_openai_connection():
     is_auth = is_authenticated()
     user_info = get_user_info() if is_auth else None
     try:
-        api_key = os.environ.get("OPENAI_API_KEY", "")
+        api_key = OPENAI_API_KEY or ""
         key_info = {
             'starts_with': api_key[:4] if api_key else 'None',
             'ends_with': api_key[-4:] if api_key else 'None',
@@ -67,7 +83,7 @@ def test_openai_connection():
         embedding = None
 
         try:
-            embedding_service = EmbeddingService()
+            embedding_service = EmbeddingService.get_instance()
             embedding = embedding_service.generate_embedding(test_text)
         except Exception as e:
             error_details = {
@@ -105,7 +121,7 @@ def database_diagnostic():
         logger.info("Starting detailed database diagnostics")
         result = {
             "timestamp": f"{datetime.datetime.now().isoformat()}",
-            "environment": "production" if os.environ.get("REPL_DEPLOYMENT") else "development",
+            "environment": "production" if IS_DEPLOYMENT else "development",
             "db_information": {},
             "collection_information": {},
             "document_information": {},
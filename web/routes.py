@@ -1,7 +1,7 @@
 import logging
 from flask import Blueprint, render_template, request, flash, jsonify, redirect, url_for, session
 from services.vector_store import VectorStore
-from config import VKB_API_KEY
+from config import VKB_API_KEY, OPENAI_API_KEY
 from web.auth import auth_required, is_authenticated, get_user_info, get_login_url, handle_logout
 from web.http_auth import http_auth_required, session_authenticated
 
@@ -72,9 +72,8 @@ def diagnostics():
         
     # Add OpenAI key info for template references
     if 'openai_key_info' not in debug_info:
-        # Check if OPENAI_API_KEY environment variable exists
-        import os
-        api_key = os.environ.get('OPENAI_API_KEY', '')
+        # Check if OPENAI_API_KEY is configured
+        api_key = OPENAI_API_KEY or ''
         
         if api_key:
             # Only show minimal info for security
@@ -191,9 +190,8 @@ def get_debug_info():
     
     # Add OpenAI key info for template references
     if 'openai_key_info' not in debug_info:
-        # Check if OPENAI_API_KEY environment variable exists
-        import os
-        api_key = os.environ.get('OPENAI_API_KEY', '')
+        # Check if OPENAI_API_KEY is configured
+        api_key = OPENAI_API_KEY or ''
         
         if api_key:
             # Only show minimal info for security